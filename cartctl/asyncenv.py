@@ -0,0 +1,178 @@
+"""
+Jarvis factory driven by a real clock on an asyncio event loop.
+"""
+
+import asyncio
+from collections import namedtuple
+
+import jarvisenv
+
+LagStats = namedtuple('LagStats', ['times', 'mean', 'max'])
+
+
+class RequestRejectedError(Exception):
+    """ Exception for a submitted request the controller has rejected """
+
+
+class AsyncEnv(jarvisenv.JarvisEnv):
+    """
+    Jarvis factory simulation running in real time, speed time units per
+    second. The events are ordered by the event kernel as in the virtual
+    time, a single loop timer waits for the next planned time, so the
+    deadlines are absolute and the jitter does not accumulate. time() is
+    the planned time of the current event, or the clock time of a request
+    submitted from another coroutine.
+    """
+
+    def __init__(self, tracks=None, speed=1.0, timer=None):
+        """
+        timer provides time() and call_at(when, callback) in seconds, as the
+        running event loop does by default (e.g. a fake clock for tests)
+        """
+        super().__init__(tracks)
+        if speed <= 0:
+            raise ValueError('invalid speed: %s' % speed)
+        self.speed = speed
+        self.timer = timer
+        # futures of the submitted requests which are not unloaded yet
+        self.pending = set()
+        self.origin = None
+        self.waiter = None
+        self.stopped = False
+        self.stepping = False
+        self.lags = 0
+        self.lag_sum = 0.0
+        self.lag_max = 0.0
+
+    def get_timer(self):
+        """ returns the timer, the running loop by default """
+        return self.timer if self.timer is not None else asyncio.get_running_loop()
+
+    def clock(self):
+        """ returns the current time of the clock in time units, as float """
+        return (self.get_timer().time() - self.origin) * self.speed
+
+    def deadline(self, when):
+        """ returns loop time when the events of the given time are due """
+        return self.origin + when / self.speed
+
+    def plan(self, when: int, event, argument=(), kwargs={}):
+        """ plans the event of the factory, wakes up the loop if needed """
+        if not self.stepping and self.origin is not None:
+            # outside of an event, catch up with the clock, but never past a planned event
+            now = int(self.clock())
+            next_time = self.kernel.next_time()
+            if next_time is not None:
+                now = min(now, next_time)
+            self.kernel.advance(now)
+        self.kernel.schedule(when, event, argument, kwargs)
+        self.wake_up()
+
+    def wake_up(self):
+        """ makes the loop recheck the plan """
+        if self.waiter is not None and not self.waiter.done():
+            self.waiter.set_result(None)
+
+    def stop(self):
+        """ stops serve() """
+        self.stopped = True
+        self.wake_up()
+
+    async def submit(self, cart_ctl, cargo_req):
+        """
+        Submits a request to the controller now and waits until it is
+        unloaded, returns the time of the unload. Raises the exception of
+        the controller, RequestRejectedError if it has rejected the request,
+        or the exception which has stopped serve() meanwhile.
+        """
+        done = asyncio.get_running_loop().create_future()
+        onunload = cargo_req.onunload
+
+        def unloaded(cart_dev, req):
+            if callable(onunload):
+                onunload(cart_dev, req)
+            if not done.done():
+                done.set_result(self.time())
+
+        def request():
+            # the failure belongs to the client, serve() goes on
+            try:
+                accepted = cart_ctl.request(cargo_req)
+            except Exception as error:
+                done.set_exception(error)
+                return
+            if accepted is False:
+                done.set_exception(RequestRejectedError('%s has been rejected' % cargo_req))
+
+        cargo_req.onunload = unloaded
+        self.pending.add(done)
+        done.add_done_callback(self.pending.discard)
+        self.plan(0, request)
+        return await done
+
+    async def serve(self, until=None, stop_when_empty=False):
+        """
+        Executes the events in real time, until the given time, stop(), or
+        with stop_when_empty until nothing is planned.
+        """
+        timer = self.get_timer()
+        # the clock stands still between the calls
+        self.origin = timer.time() - self.kernel.now / self.speed
+        self.stopped = False
+        try:
+            await self._serve(timer, until, stop_when_empty)
+        except BaseException as error:
+            # the submitted requests would never be unloaded
+            for done in list(self.pending):
+                if done.done():
+                    continue
+                if isinstance(error, asyncio.CancelledError):
+                    done.cancel()
+                else:
+                    done.set_exception(error)
+            raise
+        finally:
+            self.origin = None
+
+    async def _serve(self, timer, until, stop_when_empty):
+        """ the loop of serve() """
+        while not self.stopped:
+            next_time = self.kernel.next_time()
+            if next_time is None and stop_when_empty:
+                break
+            if until is not None and (next_time is None or next_time > until):
+                if self.clock() >= until:
+                    self.kernel.advance(until)
+                    break
+                next_time = until
+            delay = self.deadline(next_time) - timer.time() if next_time is not None else None
+            if delay is None or delay > 0:
+                self.waiter = asyncio.get_running_loop().create_future()
+                handle = timer.call_at(self.deadline(next_time), self.wake_up) if delay is not None else None
+                try:
+                    await self.waiter
+                finally:
+                    self.waiter = None
+                    if handle is not None:
+                        handle.cancel()
+                continue
+            if next_time != self.kernel.next_time():
+                # only until was due
+                continue
+            lag = -delay
+            self.lags += 1
+            self.lag_sum += lag
+            self.lag_max = max(self.lag_max, lag)
+            self.stepping = True
+            try:
+                self.kernel.step()
+            finally:
+                self.stepping = False
+
+    def run(self, until=None):
+        """ runs the plan in real time, or its part up to the given time """
+        asyncio.run(self.serve(until, stop_when_empty=until is None))
+
+    def lag_stats(self):
+        """ returns how late (in seconds) the executed times were """
+        return LagStats(self.lags, self.lag_sum / self.lags if self.lags else 0.0, self.lag_max)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Real time asyncio environment testing.
+
+import asyncio
+import heapq
+import unittest
+
+from asyncenv import AsyncEnv, RequestRejectedError
+from cart import Cart, CargoReq
+from cartctl import CartCtl
+from jarvisenv import JarvisEnv
+from workload import Workload
+
+
+class FakeTimer:
+    """ A timer of the fake clock. """
+
+    def __init__(self, entry: list) -> None:
+        self.entry = entry
+
+    def cancel(self) -> None:
+        """ Cancels the timer. """
+        self.entry[-1] = None
+
+
+class FakeClock:
+    """ A fake clock jumping to the next timer whenever the tasks of the loop are waiting. """
+
+    # loop iterations letting the ready tasks run before the time jumps
+    IDLE_ROUNDS = 20
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.timers = []
+        self.sequence = 0
+
+    def time(self) -> float:
+        """ Returns the current time in seconds. """
+        return self.now
+
+    def call_at(self, when: float, callback) -> FakeTimer:
+        """ Calls the callback at the time. """
+        entry = [when, self.sequence, callback]
+        self.sequence += 1
+        heapq.heappush(self.timers, entry)
+        return FakeTimer(entry)
+
+    async def sleep(self, delay: float) -> None:
+        """ Waits for the delay in seconds of the clock. """
+        done = asyncio.get_running_loop().create_future()
+        self.call_at(self.now + delay, lambda: done.done() or done.set_result(None))
+        await done
+
+    async def run(self, coroutine):
+        """ Runs the coroutine in the fake time, returns its result. """
+        task = asyncio.ensure_future(coroutine)
+        while not task.done():
+            for _ in range(self.IDLE_ROUNDS):
+                await asyncio.sleep(0)
+            while self.timers and self.timers[0][-1] is None:
+                heapq.heappop(self.timers)
+            if task.done():
+                break
+            if not self.timers:
+                raise RuntimeError('deadlock, nothing to wait for')
+            when, _, callback = heapq.heappop(self.timers)
+            self.now = max(self.now, when)
+            callback()
+        return task.result()
+
+
+class TestAsyncEnv(unittest.TestCase):
+    """ A test suite for the real time asyncio environment. """
+
+    SPEED = 2000
+
+    def setUp(self) -> None:
+        """ The set-up phase for each test method in the class. """
+        super().setUp()
+        self.clock = FakeClock()
+        self.env = AsyncEnv(speed=self.SPEED, timer=self.clock)
+
+    def run_env(self, until=None) -> None:
+        """ Runs the environment in the fake time, as AsyncEnv.run(). """
+        asyncio.run(self.clock.run(self.env.serve(until, stop_when_empty=until is None)))
+
+    @staticmethod
+    def serve_workload(env, run, count: int) -> list:
+        """ Serves a seeded workload, returns times and contents of unloads. """
+        unloads = []
+        cart_ctl = CartCtl(Cart(2, 150), env)
+
+        def request(cargo_req: CargoReq) -> None:
+            cargo_req.onunload = lambda c, r: unloads.append((env.time(), r.content))
+            cart_ctl.request(cargo_req)
+
+        Workload(env.get_tracks().stations(), seed=5, interval=60).feed(env, request, count)
+        run()
+        return unloads
+
+    def test_same_as_virtual(self) -> None:
+        """ The real time run serves requests at the same times as the virtual one. """
+        virtual_env = JarvisEnv()
+        virtual = self.serve_workload(virtual_env, virtual_env.run, 10)
+        self.assertEqual(virtual, self.serve_workload(self.env, self.run_env, 10))
+        self.assertEqual(self.env.time() / self.SPEED, self.clock.time())
+        stats = self.env.lag_stats()
+        self.assertGreater(stats.times, 0)
+        self.assertEqual(0.0, stats.max)
+
+    def test_submit(self) -> None:
+        """ Requests submitted by coroutines are awaited until unloaded. """
+        cart_ctl = CartCtl(Cart(1, 150), self.env)
+
+        async def client(delay: float, cargo_req: CargoReq) -> int:
+            await self.clock.sleep(delay)
+            return await self.env.submit(cart_ctl, cargo_req)
+
+        async def main() -> list:
+            server = asyncio.ensure_future(self.env.serve())
+            done = await asyncio.gather(client(0, CargoReq('A', 'B', 10, 'first')),
+                                        client(0.02, CargoReq('C', 'D', 10, 'second')))
+            self.env.stop()
+            await server
+            return done
+
+        first, second = asyncio.run(self.clock.run(main()))
+        # load 2 + move 20 + unload 2
+        self.assertEqual(24, first)
+        # submitted at 40 with the cart at B: move 20 + load 2 + move 20 + unload 2
+        self.assertEqual(84, second)
+
+    def test_failed_requests(self) -> None:
+        """ Failed requests are passed to their clients, the serving goes on. """
+
+        class Picky(CartCtl):
+            """ A controller failing on requests of fragile cargo. """
+
+            def request(self, new_cargo: CargoReq) -> bool:
+                if new_cargo.content == 'glass':
+                    raise ValueError('fragile')
+                return super().request(new_cargo)
+
+        cart_ctl = Picky(Cart(1, 150), self.env)
+
+        async def main() -> list:
+            server = asyncio.ensure_future(self.env.serve())
+            done = await asyncio.gather(self.env.submit(cart_ctl, CargoReq('A', 'B', 10, 'glass')),
+                                        self.env.submit(cart_ctl, CargoReq('A', 'X', 10, 'lost')),
+                                        self.env.submit(cart_ctl, CargoReq('A', 'B', 10, 'helmet')),
+                                        return_exceptions=True)
+            self.env.stop()
+            await server
+            return done
+
+        glass, lost, helmet = asyncio.run(self.clock.run(main()))
+        self.assertIsInstance(glass, ValueError)
+        self.assertIsInstance(lost, RequestRejectedError)
+        self.assertEqual(24, helmet)
+
+    def test_serve_failed(self) -> None:
+        """ Clients waiting for their requests get the exception which has stopped serving. """
+        cart_ctl = CartCtl(Cart(1, 150), self.env)
+
+        def fail() -> None:
+            raise RuntimeError('broken')
+
+        async def main() -> tuple:
+            self.env.plan(10, fail)
+            server = asyncio.ensure_future(self.env.serve())
+            done = await asyncio.gather(self.env.submit(cart_ctl, CargoReq('A', 'B', 10, 'helmet')),
+                                        server, return_exceptions=True)
+            return done
+
+        helmet, server = asyncio.run(self.clock.run(main()))
+        self.assertIsInstance(helmet, RuntimeError)
+        self.assertIs(helmet, server)
+
+    def test_until(self) -> None:
+        """ Run up to a time waits for it in real time. """
+        trace = []
+        self.env.plan(10, lambda: trace.append(self.env.time()))
+        self.env.plan(100, lambda: trace.append(self.env.time()))
+        self.run_env(50)
+        self.assertEqual([10], trace)
+        self.assertEqual(50, self.env.time())
+        self.assertEqual(50 / self.SPEED, self.clock.time())
+        self.run_env()
+        self.assertEqual([10, 100], trace)
+
+
+if __name__ == '__main__':
+    unittest.main()
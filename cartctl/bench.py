@@ -0,0 +1,590 @@
+#!/usr/bin/env python3
+
+"""
+Benchmarks of the cart controller and its factory environment
+"""
+
+import argparse
+import io
+import itertools
+import os
+import random
+import sched
+import tempfile
+import time
+import tracemalloc
+
+import asyncenv
+import cart
+import cartctl
+import checkpoint
+import eventbus
+import eventtrace
+import jsonlog
+import factory
+import jarvisenv
+import layouts
+import montecarlo
+import workload
+
+# the biggest layout to precompute all pairs routes for
+TABLE_SIZE_LIMIT = 2000
+
+
+def random_queries(tracks, nqueries, seed=0):
+    """ returns list of random (src, dst) pairs of the tracks """
+    rnd = random.Random(seed)
+    stations = sorted(tracks.stations())
+    return [(rnd.choice(stations), rnd.choice(stations)) for _ in range(nqueries)]
+
+
+def report(name, nstations, seconds, nqueries):
+    """ prints a single line of results """
+    print('%-24s stations=%-7d total=%8.3fs  per query=%9.3fms' %
+          (name, nstations, seconds, seconds / nqueries * 1000))
+
+
+def bench_search(sizes, nqueries):
+    """ point to point get_path latency with growing size of the layout """
+    for size in sizes:
+        tracks = factory.Tracks(layouts.grid_layout(size), precompute=False, cache_size=0)
+        queries = random_queries(tracks, nqueries)
+        start = time.perf_counter()
+        for src, dst in queries:
+            tracks.get_path(src, dst)
+        report('get_path', len(tracks.stations()), time.perf_counter() - start, nqueries)
+
+        # a destination in a different (not connected) subgraph
+        island = factory.Tracks(list(layouts.grid_layout(size)) + [
+            factory.Track('island1', 'island2', 1),
+            factory.Track('island2', 'island1', 1),
+        ], precompute=False, cache_size=0)
+        start = time.perf_counter()
+        for src, _ in queries[:10]:
+            island.get_path(src, 'island1')
+        report('get_path unreachable', len(island.stations()), time.perf_counter() - start, 10)
+
+
+def bench_table(sizes, nqueries):
+    """ all pairs route table: precomputation and lookups against searching """
+    for size in sizes:
+        if size > TABLE_SIZE_LIMIT:
+            print('%-24s stations=%-7d skipped (too large for the table)' % ('precompute', size))
+            continue
+        layout = list(layouts.grid_layout(size))
+        start = time.perf_counter()
+        table = factory.Tracks(layout, precompute=True)
+        stats = table.table_stats()
+        print('%-24s stations=%-7d time=%8.3fs  memory=%9.1fMB  (measured %.3fs)' %
+              ('precompute', stats.stations, stats.seconds, stats.bytes / 2 ** 20,
+               time.perf_counter() - start))
+        search = factory.Tracks(layout, precompute=False, cache_size=0)
+        queries = random_queries(search, nqueries)
+        for name, tracks in (('get_path search', search), ('get_path table', table)):
+            start = time.perf_counter()
+            for src, dst in queries:
+                tracks.get_path(src, dst)
+            report(name, stats.stations, time.perf_counter() - start, nqueries)
+        for name, tracks in (('get_cost search', search), ('get_cost table', table)):
+            start = time.perf_counter()
+            for src, dst in queries:
+                tracks.get_cost(src, dst)
+            report(name, stats.stations, time.perf_counter() - start, nqueries)
+
+
+def bench_cache(sizes, nqueries):
+    """ path cache on queries repeating among a handful of stations """
+    for size in sizes:
+        layout = list(layouts.grid_layout(size))
+        hot = random_queries(factory.Tracks(layout, precompute=False, cache_size=0), 8)
+        rnd = random.Random(0)
+        queries = [rnd.choice(hot) for _ in range(nqueries)]
+        for cache_size in (0, factory.Tracks.CACHE_SIZE):
+            tracks = factory.Tracks(layout, precompute=False, cache_size=cache_size)
+            start = time.perf_counter()
+            for src, dst in queries:
+                tracks.get_path(src, dst)
+            report('get_path cache=%d' % cache_size, len(tracks.stations()),
+                   time.perf_counter() - start, nqueries)
+            if cache_size:
+                print('  %s' % (tracks.cache_stats(),))
+
+
+def bench_mutate(sizes, nqueries):
+    """ incremental repair of the route table against rebuilding it """
+    for size in sizes:
+        if size > TABLE_SIZE_LIMIT:
+            print('%-24s stations=%-7d skipped (too large for the table)' % ('set_cost', size))
+            continue
+        tracks = factory.Tracks(layouts.grid_layout(size), precompute=True)
+        rnd = random.Random(0)
+        all_tracks = [track for src in sorted(tracks.stations()) for track in tracks.track_map()[src]]
+        changes = [rnd.choice(all_tracks) for _ in range(min(nqueries, 20))]
+        start = time.perf_counter()
+        for track in changes:
+            tracks.set_cost(track.src, track.dst, rnd.randint(5, 30))
+        report('set_cost repair', len(tracks.stations()), time.perf_counter() - start, len(changes))
+        start = time.perf_counter()
+        factory.RouteTable(tracks.track_map())
+        report('rebuild', len(tracks.stations()), time.perf_counter() - start, 1)
+
+
+def bench_slots(sizes, nqueries):
+    """ nearest of 16 destinations: search per slot against a single search """
+    for size in sizes:
+        tracks = factory.Tracks(layouts.grid_layout(size), precompute=False, cache_size=0)
+        queries = random_queries(tracks, nqueries * 16)
+        nheartbeats = min(nqueries, 20)
+        start = time.perf_counter()
+        for k in range(nheartbeats):
+            src = queries[16 * k][0]
+            min((sum(t.cost for t in tracks.get_path(src, dst)), dst)
+                for _, dst in queries[16 * k:16 * k + 16])
+        report('get_path per slot', len(tracks.stations()), time.perf_counter() - start, nheartbeats)
+        start = time.perf_counter()
+        for k in range(nheartbeats):
+            src = queries[16 * k][0]
+            routes = tracks.costs_from(src)
+            min((routes[dst].cost, dst) for _, dst in queries[16 * k:16 * k + 16])
+        report('costs_from', len(tracks.stations()), time.perf_counter() - start, nheartbeats)
+
+
+def bench_backend(sizes, nqueries):
+    """ memory and throughput of the track map against the compact backend """
+    for size in sizes:
+        for backend in (factory.Tracks, factory.CsrTracks):
+            tracemalloc.start()
+            tracks = backend(layouts.grid_layout(size), precompute=False, cache_size=0)
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print('%-24s stations=%-7d memory=%9.2fMB' %
+                  (backend.__name__, len(tracks.stations()), retained / 2 ** 20))
+            queries = random_queries(tracks, nqueries)
+            start = time.perf_counter()
+            for src, dst in queries:
+                tracks.get_path(src, dst)
+            report('%s get_path' % backend.__name__, len(tracks.stations()),
+                   time.perf_counter() - start, nqueries)
+
+
+def bench_alt(sizes, nqueries):
+    """ stations expanded and latency of Dijkstra against A* with landmarks """
+    for size in sizes:
+        layout = list(layouts.grid_layout(size))
+        for search in ('dijkstra', 'alt'):
+            start = time.perf_counter()
+            tracks = factory.CsrTracks(layout, precompute=False, cache_size=0, search=search)
+            setup = time.perf_counter() - start
+            queries = random_queries(tracks, nqueries)
+            start = time.perf_counter()
+            for src, dst in queries:
+                tracks.get_path(src, dst)
+            report('get_path %s' % search, len(tracks.stations()), time.perf_counter() - start, nqueries)
+            print('  expanded per query=%.0f  setup=%.3fs' % (tracks.expanded / nqueries, setup))
+
+
+def bench_startup(sizes, nqueries):
+    """ startup with the route table built against mapped from a file """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            if size > TABLE_SIZE_LIMIT:
+                print('%-24s stations=%-7d skipped (too large for the table)' % ('startup', size))
+                continue
+            layout = list(layouts.grid_layout(size))
+            filename = os.path.join(tmp_dir, 'routes%d.bin' % size)
+            for name in ('startup build+save', 'startup mmap'):
+                start = time.perf_counter()
+                tracks = factory.Tracks(layout, precompute=True, table_file=filename)
+                print('%-24s stations=%-7d time=%8.3fs' %
+                      (name, len(tracks.stations()), time.perf_counter() - start))
+            print('  table file=%.1fMB' % (os.path.getsize(filename) / 2 ** 20))
+
+
+class SchedEnv(jarvisenv.JarvisEnv):
+    """ JarvisEnv driven by sched.scheduler with a fake sleep, as before """
+
+    def __init__(self, tracks=None):
+        super().__init__(tracks)
+        self.simulation_time = 0
+        self.sched = sched.scheduler(self.time, self._sleep)
+        self.planned = 0
+
+    def plan(self, when: int, event, argument=(), kwargs={}):
+        self.planned += 1
+        self.sched.enter(when, 0, event, argument, kwargs)
+
+    def run(self, until=None):
+        self.sched.run()
+
+    def time(self):
+        return self.simulation_time
+
+    def _sleep(self, delay):
+        self.simulation_time += delay
+
+
+def simulate(env, nrequests, seed=0):
+    """ serves random requests on the Jarvis tracks """
+    rnd = random.Random(seed)
+    cart_dev = cart.Cart(4, 150)
+    ctl = cartctl.CartCtl(cart_dev, env)
+    stations = sorted(env.get_tracks().stations())
+    when = 0
+    for k in range(nrequests):
+        src, dst = rnd.sample(stations, 2)
+        when += rnd.randint(1, 40)
+        env.plan(when, ctl.request, (cart.CargoReq(src, dst, rnd.randint(10, 50), 'cargo%d' % k),))
+    env.run()
+
+
+def bench_kernel(sizes, nqueries):
+    """ events per second of sched.scheduler against the event kernel """
+    for size in sizes:
+        for name, make_env in (('sched', SchedEnv), ('kernel', jarvisenv.JarvisEnv)):
+            env = make_env()
+            counter = [0]
+
+            def tick(chain):
+                counter[0] += 1
+                if counter[0] < size * 10:
+                    # mostly zero delays, as the heartbeats of the controller
+                    env.plan(0 if counter[0] % 4 else chain % 20 + 1, tick, (chain,))
+
+            for chain in range(8):
+                env.plan(chain, tick, (chain,))
+            start = time.perf_counter()
+            env.run()
+            seconds = time.perf_counter() - start
+            print('%-24s events=%-9d time=%8.3fs  events/s=%10.0f' %
+                  ('%s chains' % name, counter[0], seconds, counter[0] / seconds))
+
+            env = make_env()
+            start = time.perf_counter()
+            simulate(env, size)
+            seconds = time.perf_counter() - start
+            events = env.planned if make_env is SchedEnv else env.kernel.executed
+            print('%-24s events=%-9d time=%8.3fs  events/s=%10.0f' %
+                  ('%s controller' % name, events, seconds, events / seconds))
+
+
+def bench_montecarlo(sizes, nqueries):
+    """ scenarios per second of the Monte Carlo runner with growing number of workers """
+    scenarios = list(montecarlo.make_scenarios(nqueries, 0, [1, 2, 4], [150]))
+    workers = 1
+    while True:
+        start = time.perf_counter()
+        for _ in montecarlo.run_scenarios(scenarios, workers):
+            pass
+        seconds = time.perf_counter() - start
+        print('%-24s scenarios=%-6d time=%8.3fs  scenarios/s=%8.0f' %
+              ('montecarlo workers=%d' % workers, len(scenarios), seconds, len(scenarios) / seconds))
+        if workers >= (os.cpu_count() or 1):
+            break
+        workers = min(2 * workers, os.cpu_count())
+
+
+def bench_workload(sizes, nqueries):
+    """ peak memory of arrivals fed one by one against planning all of them upfront """
+    for size in sizes:
+        count = size * 10
+        for name in ('preplanned', 'fed'):
+            env = jarvisenv.JarvisEnv()
+            requests = workload.Workload(env.get_tracks().stations(), interval=5)
+            arrived = [0]
+
+            def handler(cargo_req):
+                arrived[0] += 1
+
+            tracemalloc.start()
+            start = time.perf_counter()
+            if name == 'fed':
+                requests.feed(env, handler, count)
+            else:
+                when = 0
+                for delay, cargo_req in itertools.islice(requests, count):
+                    when += delay
+                    env.plan(when, handler, (cargo_req,))
+            env.run()
+            seconds = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print('%-24s arrivals=%-8d time=%8.3fs  peak memory=%9.2fMB' %
+                  ('workload %s' % name, arrived[0], seconds, peak / 2 ** 20))
+
+
+def bench_async(sizes, nqueries):
+    """ lag of the real time environment behind the planned times with growing speed """
+    for speed in (1000, 10000, 100000):
+        env = asyncenv.AsyncEnv(speed=speed)
+        ctl = cartctl.CartCtl(cart.Cart(4, 150), env)
+        workload.Workload(env.get_tracks().stations(), interval=40).feed(env, ctl.request, nqueries)
+        start = time.perf_counter()
+        env.run()
+        stats = env.lag_stats()
+        print('%-24s times=%-8d time=%8.3fs  mean lag=%8.3fms  max lag=%8.3fms' %
+              ('async speed=%d' % speed, stats.times, time.perf_counter() - start,
+               stats.mean * 1000, stats.max * 1000))
+
+
+def bench_checkpoint(sizes, nqueries):
+    """ forking a warm simulation from a checkpoint against replaying its prefix """
+    for size in (nqueries, nqueries * 10):
+        tracks = factory.Tracks(jarvisenv.Jarvis.LAYOUT)
+
+        def warm_up():
+            env = jarvisenv.JarvisEnv(tracks)
+            ctl = cartctl.CartCtl(cart.Cart(4, 150), env)
+            workload.Workload(tracks.stations(), interval=60).feed(env, ctl.request, size * 2)
+            env.run(size * 60)
+            return env, ctl
+
+        start = time.perf_counter()
+        state = warm_up()
+        replay = time.perf_counter() - start
+        start = time.perf_counter()
+        data = checkpoint.dumps(state, [tracks])
+        dump = time.perf_counter() - start
+        start = time.perf_counter()
+        checkpoint.loads(data, [tracks])
+        load = time.perf_counter() - start
+        print('%-24s requests=%-7d replay=%8.3fs  dump=%8.3fs  restore=%8.3fs  size=%8.1fkB' %
+              ('checkpoint', len(state[1].requests), replay, dump, load, len(data) / 2 ** 10))
+
+
+def bench_trace(sizes, nqueries):
+    """ cost of recording an event and streaming replay of the trace """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size in sizes:
+            filename = os.path.join(tmp_dir, 'trace%d.bin' % size)
+            cargo = [cart.CargoReq('S%d' % (k % 100), 'S%d' % (k % 37), 10, 'cargo%d' % (k % 1000))
+                     for k in range(1000)]
+            nevents = size * 100
+            with eventtrace.TraceWriter(open(filename, 'wb')) as writer:
+                start = time.perf_counter()
+                for k in range(nevents):
+                    writer.load(k, k % 4, cargo[k % 1000])
+                seconds = time.perf_counter() - start
+            print('%-24s events=%-9d time=%8.3fs  per event=%7.3fus  file=%8.1fMB' %
+                  ('trace record', nevents, seconds, seconds / nevents * 1e6,
+                   os.path.getsize(filename) / 2 ** 20))
+            start = time.perf_counter()
+            with open(filename, 'rb') as trace_file:
+                stats = eventtrace.trace_stats(eventtrace.read_trace(trace_file))
+            seconds = time.perf_counter() - start
+            print('%-24s events=%-9d time=%8.3fs  events/s=%10.0f' %
+                  ('trace replay', stats.events, seconds, stats.events / seconds))
+
+
+def bench_aging(sizes, nqueries):
+    """ aging of the queued requests per heartbeat with growing queue """
+    for size in sizes:
+        env = jarvisenv.JarvisEnv()
+        ctl = cartctl.CartCtl(cart.Cart(1, 150), env)
+        for k in range(size):
+            cargo_req = cart.CargoReq('A', 'B', 10, 'cargo%d' % k)
+            cargo_req.born = k // 10
+            ctl.requests.add(cargo_req)
+            ctl.add_deadlines(cargo_req)
+        # nothing is due before PROMOTE_AFTER, then some requests are promoted every heartbeat
+        for name, times in (('waiting', range(cartctl.CartCtl.PROMOTE_AFTER)),
+                            ('promoting', range(cartctl.CartCtl.PROMOTE_AFTER, 2 * cartctl.CartCtl.PROMOTE_AFTER))):
+            start = time.perf_counter()
+            for now in times:
+                env.kernel.now = now
+                ctl.update_prio_requests()
+            seconds = time.perf_counter() - start
+            print('%-24s requests=%-7d per heartbeat=%9.3fms' %
+                  ('aging %s' % name, size, seconds / len(times) * 1000))
+
+
+def bench_memory(sizes, nqueries):
+    """ bytes per request, alone and queued in the controller """
+    for size in sizes:
+        stations = ['S%d' % k for k in range(100)]
+        tracemalloc.start()
+        requests = [cart.CargoReq(stations[k % 100], stations[k % 37], 10, k) for k in range(size)]
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%-24s requests=%-7d per request=%7.1fB' % ('CargoReq', size, retained / size))
+        env = jarvisenv.JarvisEnv()
+        ctl = cartctl.CartCtl(cart.Cart(1, 150), env)
+        tracemalloc.start()
+        for cargo_req in requests:
+            ctl.requests.add(cargo_req)
+            ctl.add_deadlines(cargo_req)
+        retained, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        print('%-24s requests=%-7d per request=%7.1fB' % ('queued in CartCtl', size, retained / size))
+
+
+def bench_cart(sizes, nqueries):
+    """ slot bookkeeping queries of a cart with many slots, kept up to date against scanning the slots """
+    for nslots in (64, 256, 1024):
+        cart_dev = cart.Cart(nslots, 10 ** 9)
+        for slot in range(nslots - 1):
+            cart_dev.start_loading(cart.CargoReq('A', 'B', 10, slot), slot)
+            cart_dev.finish_loading()
+        nqueries_total = nqueries * 100
+        start = time.perf_counter()
+        for _ in range(nqueries_total):
+            cart_dev.empty()
+            cart_dev.load_sum()
+            cart_dev.get_free_slot()
+            cart_dev.get_prio_idx()
+        seconds = time.perf_counter() - start
+        print('%-24s slots=%-7d per query=%9.3fus' % ('cart bookkeeping', nslots, seconds / nqueries_total * 1e6))
+        slots = cart_dev.slots
+        start = time.perf_counter()
+        for _ in range(nqueries_total):
+            # the scans the queries used to do
+            slots == [None] * len(slots)
+            sum(slot.weight for slot in slots if slot)
+            next((i for i, slot in enumerate(slots) if slot is None), -1)
+            next((i for i, slot in enumerate(slots) if slot and slot.prio), -1)
+        seconds = time.perf_counter() - start
+        print('%-24s slots=%-7d per query=%9.3fus' % ('cart scans', nslots, seconds / nqueries_total * 1e6))
+
+
+def bench_logging(sizes, nqueries):
+    """ controller heartbeats per second with logging disabled and enabled """
+    for size in sizes:
+        for name in ('logging off', 'logging json'):
+            handler = jsonlog.enable(stream=io.StringIO()) if name == 'logging json' else None
+            try:
+                env = jarvisenv.JarvisEnv()
+                start = time.perf_counter()
+                simulate(env, size)
+                seconds = time.perf_counter() - start
+            finally:
+                if handler is not None:
+                    jsonlog.disable(handler)
+            print('%-24s events=%-9d time=%8.3fs  events/s=%10.0f' %
+                  (name, env.kernel.executed, seconds, env.kernel.executed / seconds))
+
+
+class SaturatedCtl(cartctl.CartCtl):
+    """ controller with requests never getting priority, to measure the throughput of a full queue """
+
+    PROMOTE_AFTER = float('inf')
+
+
+def bench_batch(sizes, nqueries):
+    """ deliveries per simulated time with single against batched loads and unloads """
+    for size in sizes:
+        for name, dwell in (('single', None), ('batch', cartctl.Dwell()), ('batch +1/cargo', cartctl.Dwell(2, 1))):
+            env = jarvisenv.JarvisEnv()
+            ctl = SaturatedCtl(cart.Cart(4, 150), env, idle_wakeup=True, dwell=dwell)
+            delivered = [0]
+
+            def request(cargo_req):
+                cargo_req.onunload = lambda cart_dev, req: delivered.__setitem__(0, delivered[0] + 1)
+                ctl.request(cargo_req)
+
+            # bursts of requests between a few busy stations, faster than a cart can serve them
+            od = {('A', 'C'): 4, ('B', 'D'): 3, ('C', 'A'): 2, ('D', 'B'): 1}
+            workload.Workload(env.get_tracks().stations(), interval=10, burst=4, od=od,
+                              weights=(10, 30)).feed(env, request, size)
+            start = time.perf_counter()
+            env.run(size * 5)
+            seconds = time.perf_counter() - start
+            print('%-24s requests=%-7d delivered=%-7d per 1000 ticks=%7.1f  time=%7.3fs' %
+                  (name, size, delivered[0], delivered[0] * 1000 / env.time(), seconds))
+
+
+def bench_bus(sizes, nqueries):
+    """ simulation with no event bus, a bus without subscribers, and a subscribed one """
+    for size in sizes:
+        for name in ('no bus', 'no subscribers', 'subscribed'):
+            env = jarvisenv.JarvisEnv()
+            ctl = SaturatedCtl(cart.Cart(4, 150), env, idle_wakeup=True)
+            events = [0]
+            if name != 'no bus':
+                bus = eventbus.EventBus(ctl, env)
+                if name == 'subscribed':
+                    bus.subscribe(lambda batch: events.__setitem__(0, events[0] + len(batch)))
+            workload.Workload(env.get_tracks().stations(), interval=100).feed(env, ctl.request, size)
+            start = time.perf_counter()
+            env.run()
+            seconds = time.perf_counter() - start
+            print('%-24s requests=%-7d events=%-8d time=%7.3fs  sim time=%d' %
+                  (name, size, events[0], seconds, env.time()))
+
+
+def bench_queue(sizes, nqueries):
+    """ loading decisions and loads of a controller with many requests waiting at other stations """
+    for size in sizes:
+        env = jarvisenv.JarvisEnv()
+        ctl = cartctl.CartCtl(cart.Cart(1, 150), env)
+        stations = ['S%d' % k for k in range(100)]
+        for k in range(size):
+            cargo_req = cart.CargoReq(stations[k % 100], 'A', 10, 'cargo%d' % k)
+            cargo_req.born = k // 10
+            ctl.requests.add(cargo_req)
+        ctl.status = cartctl.Status.Normal
+        ctl.cart.pos = 'A'
+        start = time.perf_counter()
+        for _ in range(nqueries):
+            ctl.try_load_here_single()
+        seconds = time.perf_counter() - start
+        print('%-24s requests=%-7d per call=%9.3fus' % ('nothing to load here', size, seconds / nqueries * 1e6))
+        start = time.perf_counter()
+        for _ in range(nqueries):
+            ctl.find_load_there_single()
+        seconds = time.perf_counter() - start
+        print('%-24s requests=%-7d per call=%9.3fus' % ('load somewhere else', size, seconds / nqueries * 1e6))
+        ctl.cart.pos = 'S7'
+        nloads = min(nqueries, size // 100)
+        start = time.perf_counter()
+        for _ in range(nloads):
+            ctl.try_load_here_single()
+            ctl.perform_load()
+            ctl.cart.start_unloading(0)
+            ctl.cart.finish_unloading()
+        seconds = time.perf_counter() - start
+        print('%-24s requests=%-7d per load=%9.3fus' % ('load and remove', size, seconds / nloads * 1e6))
+
+
+BENCHMARKS = {
+    'aging': bench_aging,
+    'alt': bench_alt,
+    'async': bench_async,
+    'backend': bench_backend,
+    'batch': bench_batch,
+    'bus': bench_bus,
+    'cache': bench_cache,
+    'cart': bench_cart,
+    'checkpoint': bench_checkpoint,
+    'kernel': bench_kernel,
+    'logging': bench_logging,
+    'memory': bench_memory,
+    'montecarlo': bench_montecarlo,
+    'mutate': bench_mutate,
+    'queue': bench_queue,
+    'search': bench_search,
+    'slots': bench_slots,
+    'startup': bench_startup,
+    'table': bench_table,
+    'trace': bench_trace,
+    'workload': bench_workload,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('benchmarks', nargs='*', metavar='benchmark',
+                        help='one of %s (all by default)' % ', '.join(sorted(BENCHMARKS)))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 40000],
+                        help='numbers of stations of the generated layouts')
+    parser.add_argument('--queries', type=int, default=100,
+                        help='number of queries per layout')
+    args = parser.parse_args()
+    for name in args.benchmarks:
+        if name not in BENCHMARKS:
+            parser.error('unknown benchmark: %s' % name)
+    for name in args.benchmarks or sorted(BENCHMARKS):
+        print('== %s' % name)
+        BENCHMARKS[name](args.sizes, args.queries)
+
+
+if __name__ == '__main__':
+    main()
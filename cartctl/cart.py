@@ -3,6 +3,10 @@ Implementation of a Cart in a robotic factory.
 """
 
 import enum
+import logging
+import sys
+
+logger = logging.getLogger(__name__)
 
 
 class Status(enum.Enum):
@@ -15,21 +19,28 @@ class Status(enum.Enum):
 
 
 class CargoReq:
-    """ Object for a single cargo """
+    """
+    Object for a single cargo. Its attributes are slots, as there can be
+    millions of requests queued, and the stations are interned.
+    """
+
+    __slots__ = ('src', 'dst', 'weight', 'content', 'prio', 'born', 'onload', 'onunload', 'context', 'trace_id')
 
     def __init__(self, src, dst, weight, content):
         assert weight > 0
-        self.src = src
-        self.dst = dst
+        self.src = sys.intern(src) if type(src) is str else src
+        self.dst = sys.intern(dst) if type(dst) is str else dst
         self.weight = weight
         self.content = content
         self.prio = False
         self.born = 0
-        # event call-backs (post events)
+        # event call-backs (post events), the shared class-level function by default
         self.onload = CargoReq.just_pass_it
         self.onunload = CargoReq.just_pass_it
         # user defined context
         self.context = None
+        # number of the request in a trace, assigned by eventtrace.TraceWriter
+        self.trace_id = -1
 
     def __str__(self):
         return '%sCargoReq(%s)' % ("Priority" if self.prio else "", self.content)
@@ -40,13 +51,15 @@ class CargoReq:
 
     def load(self, cart_dev):
         """ load itself, invoke callback """
-        if callable(self.onload):
-            self.onload(cart_dev, self)
+        onload = self.onload
+        if onload is not CargoReq.just_pass_it and callable(onload):
+            onload(cart_dev, self)
 
     def unload(self, cart_dev):
         """ unload itself, invoke callback """
-        if callable(self.onunload):
-            self.onunload(cart_dev, self)
+        onunload = self.onunload
+        if onunload is not CargoReq.just_pass_it and callable(onunload):
+            onunload(cart_dev, self)
 
     def just_pass_it(self, argument=None):
         """ Dummy function (callback) for load and unload events """
@@ -56,11 +69,32 @@ class CartError(Exception):
     """ Exception for some self-checks in Cart class """
 
 
+class Batch:
+    """ (cargo_req, slot) pairs of a batch as a log argument, formatted only if the record is emitted """
+
+    __slots__ = ('pairs',)
+
+    def __init__(self, pairs):
+        self.pairs = pairs
+
+    def __str__(self):
+        return str([str(cargo_req) for cargo_req, _ in self.pairs])
+
+
 class Cart:
     """ Cart device """
 
+    __slots__ = ('slots', 'load_capacity', 'status', 'data', 'pos', 'debug_lvl', 'onmove',
+                 'free_slots', 'all_slots', 'loaded_weight', 'prio_slots')
+
     def __init__(self, nslots, load_capacity, debug_lvl=0):
         self.slots = [None] * nslots
+        # bookkeeping of the slots updated on loading and unloading:
+        # bitmaps of the free slots and of the slots with prioritised cargo, sum of the load
+        self.all_slots = (1 << nslots) - 1
+        self.free_slots = self.all_slots
+        self.prio_slots = 0
+        self.loaded_weight = 0
         self.load_capacity = load_capacity
         self.status = Status.Idle
         self.data = None
@@ -76,12 +110,20 @@ class Cart:
     def just_pass_it(self, argument=None):
         """ Dummy function for a move """
 
-    def log(self, msg):
-        """ a simple logger """
+    def log(self, msg, *args, event='log'):
+        """
+        logs an event of the cart, printed with debug_lvl as before and
+        passed to the logger with structured fields; the message is only
+        formatted with args if it is printed or the logger is enabled for
+        debug, log(msg) of a plain message works as before
+        """
         if self.debug_lvl > 1:
             print(self)
         if self.debug_lvl > 0:
-            print(msg)
+            print(msg % args if args else msg)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(msg, *args, extra={'event': event, 'pos': self.pos, 'status': self.status.name,
+                                            'load': self.loaded_weight})
 
     def check_idle(self):
         if self.status != Status.Idle:
@@ -89,22 +131,23 @@ class Cart:
 
     def empty(self):
         """ returns True if cart has no cargo at all """
-        return self.slots == [None] * len(self.slots)
+        return self.free_slots == self.all_slots
 
     def load_sum(self):
         """ return sum load of all cargos """
-        sum_weight = 0
-        for slot in self.slots:
-            if slot:
-                sum_weight += slot.weight
-        return sum_weight
+        return self.loaded_weight
 
     def get_prio_idx(self):
-        """ returns index of slot index with prioritized cargo or -1 if there is none """
-        for i in range(len(self.slots)):
-            if self.slots[i].prio:
-                return i
-        return -1
+        """
+        returns index of slot index with prioritized cargo or -1 if there is none,
+        the priority of cargo is taken when it is loaded
+        """
+        prio_slots = self.prio_slots
+        return (prio_slots & -prio_slots).bit_length() - 1
+
+    def prio_count(self):
+        """ returns number of prioritized cargos """
+        return bin(self.prio_slots).count('1')
 
     def check_free_slot(self, slot):
         """ pass or raise an exception about invalid slot number """
@@ -126,19 +169,17 @@ class Cart:
 
     def get_free_slot(self):
         """ returns index of free slot, or -1 if all slots are occupied """
-        for i in range(len(self.slots)):
-            if self.slots[i] is None:
-                return i
-        return -1
+        free_slots = self.free_slots
+        return (free_slots & -free_slots).bit_length() - 1
 
     def set_idle(self):
         """ helper function to idle the cart """
-        self.log("setting Idle")
+        self.log("setting Idle", event='idle')
         self.status = Status.Idle
         self.data = None
 
     def start_moving(self, destination):
-        self.log("at %s, starting moving to %s" % (self.pos, destination))
+        self.log("at %s, starting moving to %s", self.pos, destination, event='start_moving')
         self.check_idle()
         self.status = Status.Moving
         self.data = destination
@@ -147,14 +188,14 @@ class Cart:
         # self.log("started")
 
     def finish_moving(self):
-        self.log("finishing moving to %s" % self.data)
+        self.log("finishing moving to %s", self.data, event='finish_moving')
         assert self.status == Status.Moving
         self.pos = self.data
         self.set_idle()
         # self.log("finished")
 
     def start_loading(self, cargo_req, slot):
-        self.log("start loading: %s" % cargo_req)
+        self.log("start loading: %s", cargo_req, event='start_loading')
         self.check_idle()
         self.check_free_slot(slot)
         self.status = Status.Loading
@@ -163,30 +204,92 @@ class Cart:
         # here, a factory can start loading to the slot
 
     def finish_loading(self):
-        self.log("finishing loading")
+        self.log("finishing loading", event='finish_loading')
         assert self.status == Status.Loading
         cargo_req, slot = self.data
-        self.slots[slot] = cargo_req
+        self.put_cargo(cargo_req, slot)
         self.set_idle()
         # self.log("finished")
         cargo_req.load(self)
         return cargo_req
 
+    def start_loading_many(self, batch):
+        """ starts loading all the (cargo_req, slot) pairs of the batch at once """
+        self.log("start loading: %s", Batch(batch), event='start_loading')
+        self.check_idle()
+        slots = set()
+        for _, slot in batch:
+            self.check_free_slot(slot)
+            if slot in slots:
+                raise ValueError("slot %d loaded twice" % slot)
+            slots.add(slot)
+        self.status = Status.Loading
+        self.data = list(batch)
+
+    def finish_loading_many(self):
+        """ finishes loading of the batch, returns the list of the loaded cargo """
+        self.log("finishing loading", event='finish_loading')
+        assert self.status == Status.Loading
+        batch = self.data
+        for cargo_req, slot in batch:
+            self.put_cargo(cargo_req, slot)
+        self.set_idle()
+        for cargo_req, _ in batch:
+            cargo_req.load(self)
+        return [cargo_req for cargo_req, _ in batch]
+
     def start_unloading(self, slot):
-        self.log("start unloading")
+        self.log("start unloading", event='start_unloading')
         self.check_idle()
         self.check_loaded_slot(slot)
         self.status = Status.Unloading
         self.data = slot
-        self.log("started")
+        self.log("started", event='start_unloading')
         # here, a factory can start unloading the slot
 
     def finish_unloading(self):
-        self.log("finishing unloading")
+        self.log("finishing unloading", event='finish_unloading')
         assert self.status == Status.Unloading
-        cargo_req = self.slots[self.data]
-        self.slots[self.data] = None
+        cargo_req = self.take_cargo(self.data)
         self.set_idle()
-        self.log("finished")
+        self.log("finished", event='finish_unloading')
         cargo_req.unload(self)
         return cargo_req
+
+    def start_unloading_many(self, slots):
+        """ starts unloading all the slots at once """
+        self.log("start unloading %s", slots, event='start_unloading')
+        self.check_idle()
+        for slot in slots:
+            self.check_loaded_slot(slot)
+        if len(set(slots)) != len(slots):
+            raise ValueError("slots %s unloaded twice" % (slots,))
+        self.status = Status.Unloading
+        self.data = list(slots)
+
+    def finish_unloading_many(self):
+        """ finishes unloading of the slots, returns the list of the unloaded cargo """
+        self.log("finishing unloading", event='finish_unloading')
+        assert self.status == Status.Unloading
+        unloaded = [self.take_cargo(slot) for slot in self.data]
+        self.set_idle()
+        for cargo_req in unloaded:
+            cargo_req.unload(self)
+        return unloaded
+
+    def put_cargo(self, cargo_req, slot):
+        """ puts the cargo to the slot, keeps the bookkeeping """
+        self.slots[slot] = cargo_req
+        self.free_slots &= ~(1 << slot)
+        if cargo_req.prio:
+            self.prio_slots |= 1 << slot
+        self.loaded_weight += cargo_req.weight
+
+    def take_cargo(self, slot):
+        """ takes the cargo from the slot and returns it, keeps the bookkeeping """
+        cargo_req = self.slots[slot]
+        self.slots[slot] = None
+        self.free_slots |= 1 << slot
+        self.prio_slots &= ~(1 << slot)
+        self.loaded_weight -= cargo_req.weight
+        return cargo_req
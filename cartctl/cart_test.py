@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Cart device testing.
+
+import contextlib
+import io
+import json
+import logging
+import unittest
+
+import jsonlog
+from cart import Cart, CargoReq
+
+
+class TestCart(unittest.TestCase):
+    """ A test suite for the cart device. """
+
+    @staticmethod
+    def load(cart: Cart, cargo_req: CargoReq, slot: int) -> None:
+        """ Loads the cargo to the slot. """
+        cart.start_loading(cargo_req, slot)
+        cart.finish_loading()
+
+    @staticmethod
+    def unload(cart: Cart, slot: int) -> CargoReq:
+        """ Unloads the cargo from the slot. """
+        cart.start_unloading(slot)
+        return cart.finish_unloading()
+
+    def test_bookkeeping(self) -> None:
+        """ Free slots, load and prioritised cargo follow loading and unloading. """
+        cart = Cart(70, 1000)
+        self.assertTrue(cart.empty())
+        self.assertEqual((0, 0, -1, 0), (cart.get_free_slot(), cart.load_sum(), cart.get_prio_idx(),
+                                         cart.prio_count()))
+        prio = CargoReq('A', 'B', 30, 'prio')
+        prio.set_priority()
+        self.load(cart, CargoReq('A', 'B', 10, 'first'), 0)
+        self.load(cart, prio, 65)
+        self.load(cart, CargoReq('A', 'B', 20, 'third'), 1)
+        self.assertFalse(cart.empty())
+        self.assertEqual((2, 60, 65, 1), (cart.get_free_slot(), cart.load_sum(), cart.get_prio_idx(),
+                                          cart.prio_count()))
+        self.assertEqual('first', self.unload(cart, 0).content)
+        self.assertEqual((0, 50, 65), (cart.get_free_slot(), cart.load_sum(), cart.get_prio_idx()))
+        self.assertIs(prio, self.unload(cart, 65))
+        self.unload(cart, 1)
+        self.assertTrue(cart.empty())
+        self.assertEqual((0, 0, -1, 0), (cart.get_free_slot(), cart.load_sum(), cart.get_prio_idx(),
+                                         cart.prio_count()))
+
+    def test_full(self) -> None:
+        """ A full cart has no free slot. """
+        cart = Cart(2, 100)
+        self.load(cart, CargoReq('A', 'B', 10, 'foo'), 1)
+        self.load(cart, CargoReq('A', 'B', 10, 'bar'), 0)
+        self.assertEqual(-1, cart.get_free_slot())
+        self.assertRaises(ValueError, cart.start_loading, CargoReq('A', 'B', 10, 'baz'), 0)
+
+    def test_many(self) -> None:
+        """ Batches of cargo are loaded and unloaded at once. """
+        cart = Cart(4, 100)
+        foo, bar, baz = (CargoReq('A', 'B', 10, content) for content in ('foo', 'bar', 'baz'))
+        self.assertRaises(ValueError, cart.start_loading_many, [(foo, 1), (bar, 1)])
+        stream = io.StringIO()
+        handler = jsonlog.enable(stream=stream)
+        try:
+            cart.start_loading_many([(foo, 1), (bar, 3), (baz, 0)])
+        finally:
+            jsonlog.disable(handler)
+        self.assertEqual("start loading: ['CargoReq(foo)', 'CargoReq(bar)', 'CargoReq(baz)']",
+                         json.loads(stream.getvalue())['message'])
+        self.assertEqual([None] * 4, cart.slots)
+        self.assertEqual([foo, bar, baz], cart.finish_loading_many())
+        self.assertEqual([baz, foo, None, bar], cart.slots)
+        self.assertEqual((2, 30), (cart.get_free_slot(), cart.load_sum()))
+        self.assertRaises(ValueError, cart.start_unloading_many, [1, 2])
+        cart.start_unloading_many([3, 0])
+        self.assertEqual([bar, baz], cart.finish_unloading_many())
+        self.assertEqual([None, foo, None, None], cart.slots)
+        self.assertEqual((0, 10), (cart.get_free_slot(), cart.load_sum()))
+
+    def test_json_log(self) -> None:
+        """ Enabled logging emits a JSON record per event of the cart. """
+        stream = io.StringIO()
+        handler = jsonlog.enable(stream=stream)
+        try:
+            cart = Cart(1, 100)
+            cart.pos = 'A'
+            self.load(cart, CargoReq('A', 'B', 10, 'foo'), 0)
+        finally:
+            jsonlog.disable(handler)
+        records = [json.loads(line) for line in stream.getvalue().splitlines()]
+        self.assertEqual(['start_loading', 'finish_loading', 'idle'], [r['event'] for r in records])
+        self.assertEqual('start loading: CargoReq(foo)', records[0]['message'])
+        self.assertEqual(('A', 'Loading', 0), (records[1]['pos'], records[1]['status'], records[1]['load']))
+        self.assertEqual(10, records[2]['load'])
+        # disabled again
+        cart.start_unloading(0)
+        self.assertEqual(len(records), len(stream.getvalue().splitlines()))
+
+    def test_log_levels(self) -> None:
+        """ Disabled logging restores the levels the loggers had before. """
+        logger = logging.getLogger('cart')
+        logger.setLevel(logging.WARNING)
+        try:
+            jsonlog.disable(jsonlog.enable(stream=io.StringIO()))
+            self.assertEqual(logging.WARNING, logger.level)
+        finally:
+            logger.setLevel(logging.NOTSET)
+
+    def test_log_message(self) -> None:
+        """ A plain message is logged as it is, even with a percent sign. """
+        cart = Cart(1, 100, debug_lvl=1)
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cart.log("100% loaded")
+            cart.log("loaded %s", 'foo', event='finish_loading')
+        self.assertEqual("100% loaded\nloaded foo\n", stdout.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -5,8 +5,13 @@ Cart Controller in a factory
 """
 
 import enum
+import heapq
+import logging
 
 import cart
+import requestqueue
+
+logger = logging.getLogger(__name__)
 
 
 class Status(enum.Enum):
@@ -21,38 +26,102 @@ class LongPrioRequestError(Exception):
     """ Exception for prioritised requests waiting too long. """
 
 
+class Dwell:
+    """ Dwell time model of a batched load or unload: fixed ticks plus ticks per each further cargo """
+
+    def __init__(self, fixed=2, per_cargo=0):
+        self.fixed = fixed
+        self.per_cargo = per_cargo
+
+    def __call__(self, count):
+        """ returns ticks of loading or unloading count cargo at once """
+        return self.fixed + self.per_cargo * (count - 1)
+
+
 class CartCtl:
     """ Cart controller """
 
-    def __init__(self, cart_device, factory):
+    # time units after which a waiting request gets priority; the thresholds
+    # are looked up on the instance, so a subclass or an instance may change them
+    PROMOTE_AFTER = 60
+
+    def __init__(self, cart_device, factory, idle_wakeup=False, dwell=None):
+        """
+        with idle_wakeup, the idle controller wakes up by itself when
+        a waiting request is due to be promoted (or to expire), and plans
+        a single heartbeat for requests arriving at the same time;
+        with a dwell time model (e.g. Dwell()), the controller unloads all
+        the cargo for a station and loads all the eligible requests there
+        in a single batch, which takes dwell(number of cargo) ticks
+        """
         self.cart = cart_device
         self.time = factory.time
         self.plan = factory.plan
         self.tracks = factory.get_tracks()
         if self.cart.pos is None and self.tracks:
             self.cart.pos = list(self.tracks.stations())[0]
-        self.requests = []
+        self.requests = requestqueue.RequestQueue()
         self.inprogress = []
         self.status = Status.Idle
         self.only_unload = False
+        # opt-in recorder of the events, e.g. eventtrace.TraceWriter
+        self.tracer = None
+        # event bus with subscribers, set by eventbus.EventBus
+        self.bus = None
+        # heap of [deadline, sequence, cargo_req] of the promotions, cargo_req is None if cancelled
+        self.promotions = []
+        # cargo_req -> its entries in the deadline heaps, cancelled when it is loaded
+        self.deadlines = {}
+        self.sequence = 0
+        self.idle_wakeup = idle_wakeup
+        self.dwell = dwell
+        # time of the planned wake-up of the idle controller, or None
+        self.wakeup = None
+        # number of rejected requests which can never be served
+        self.rejected = 0
 
     def request(self, new_cargo: cart.CargoReq):
-        """ enqueue a new request for transfer """
-        self.requests.append(new_cargo)
+        """
+        enqueue a new request for transfer, returns False if it is rejected
+        (logged and counted in rejected) as there is no path from the cart
+        to src or from src to dst; it usually runs as a planned event, so it
+        does not raise not to stop the whole simulation
+        """
+        if not self.tracks.reachable(self.cart.pos, new_cargo.src) or \
+                not self.tracks.reachable(new_cargo.src, new_cargo.dst):
+            self.rejected += 1
+            logger.warning('%s from %s to %s can never be served', new_cargo, new_cargo.src, new_cargo.dst,
+                           extra={'event': 'unreachable', 'time': self.time(), 'pos': self.cart.pos})
+            return False
         new_cargo.born = self.time()
+        self.requests.add(new_cargo)
+        self.add_deadlines(new_cargo)
+        if self.tracer is not None:
+            self.tracer.request(new_cargo.born, new_cargo)
         if self.status == Status.Idle:
-            self.plan(0, self.heartbeat)
+            if self.idle_wakeup:
+                self.wake_up(0)
+            else:
+                self.plan(0, self.heartbeat)
+        return True
 
     def sched_unload(self, slot):
         """ schedule the unload """
         # should not be constrained
         # from now, after 2 tics, perform unload
         self.cart.start_unloading(slot)
+        if self.tracer is not None:
+            self.tracer.unload(self.time(), slot, self.cart.slots[slot])
         self.plan(2, self.perform_unload)
 
     def perform_unload(self):
         """ proceed unloading current slot """
-        self.cart.finish_unloading()
+        slot = self.cart.data
+        cargo_req = self.cart.finish_unloading()
+        if self.tracer is not None:
+            self.tracer.unloaded(self.time(), slot, cargo_req)
+        if self.bus is not None:
+            self.bus.unloaded(self.time(), slot, cargo_req)
         self.plan(0, self.heartbeat)
 
     def try_unload_here_single(self):
@@ -66,15 +135,49 @@ class CartCtl:
                 return slot
         return -1
 
-    def sched_load(self, slot, request_idx):
+    def try_unload_here_many(self):
+        """ unload all the cargo for here in a batch, returns its first slot or -1 """
+        pos = self.cart.pos
+        slots = [slot for slot, cargo_req in enumerate(self.cart.slots)
+                 if cargo_req is not None and cargo_req.dst == pos]
+        if not slots:
+            return -1
+        self.cart.start_unloading_many(slots)
+        if self.tracer is not None:
+            for slot in slots:
+                self.tracer.unload(self.time(), slot, self.cart.slots[slot])
+        self.plan(self.dwell(len(slots)), self.perform_unload_many)
+        return slots[0]
+
+    def perform_unload_many(self):
+        """ proceed unloading the batch of slots """
+        slots = self.cart.data
+        unloaded = self.cart.finish_unloading_many()
+        if self.tracer is not None:
+            for slot, cargo_req in zip(slots, unloaded):
+                self.tracer.unloaded(self.time(), slot, cargo_req)
+        if self.bus is not None:
+            for slot, cargo_req in zip(slots, unloaded):
+                self.bus.unloaded(self.time(), slot, cargo_req)
+        self.plan(0, self.heartbeat)
+
+    def sched_load(self, slot, cargo_req):
         """ schedule the load """
-        self.cart.start_loading(self.requests[request_idx], slot)
+        self.cart.start_loading(cargo_req, slot)
+        if self.tracer is not None:
+            self.tracer.load(self.time(), slot, cargo_req)
         self.plan(2, self.perform_load)
 
     def perform_load(self):
         """ proceed loading some cargo from current pos """
+        slot = self.cart.data[1]
         cargo_req = self.cart.finish_loading()
         self.requests.remove(cargo_req)
+        self.cancel_deadlines(cargo_req)
+        if self.tracer is not None:
+            self.tracer.loaded(self.time(), slot, cargo_req)
+        if self.bus is not None:
+            self.bus.loaded(self.time(), slot, cargo_req)
         self.plan(0, self.heartbeat)
 
     def try_load_here_single(self):
@@ -87,68 +190,129 @@ class CartCtl:
         if free_cap <= 0:
             # no free capacity
             return -1
-        for request_idx in range(len(self.requests)):
-            request = self.requests[request_idx]
-            if request.src == self.cart.pos and request.weight <= free_cap:
-                if (self.status == Status.UnloadOnly and request.prio) or \
-                        (self.status != Status.UnloadOnly and not request.prio):
-                    self.sched_load(free_slot, request_idx)
-                    return free_slot
+        # only prioritised requests are loaded in UnloadOnly, only the normal ones otherwise
+        for request in self.requests.at(self.status == Status.UnloadOnly, self.cart.pos):
+            if request.weight <= free_cap:
+                self.sched_load(free_slot, request)
+                return free_slot
         return -1
 
+    def try_load_here_many(self):
+        """ load here all the requests fitting to the free slots in a batch, returns its first slot or -1 """
+        free_slots = [slot for slot, cargo_req in enumerate(self.cart.slots) if cargo_req is None]
+        free_cap = self.cart.load_capacity - self.cart.load_sum()
+        batch = []
+        for request in self.requests.at(self.status == Status.UnloadOnly, self.cart.pos):
+            if len(batch) == len(free_slots) or free_cap <= 0:
+                break
+            if request.weight <= free_cap:
+                batch.append((request, free_slots[len(batch)]))
+                free_cap -= request.weight
+        if not batch:
+            return -1
+        self.cart.start_loading_many(batch)
+        if self.tracer is not None:
+            for request, slot in batch:
+                self.tracer.load(self.time(), slot, request)
+        self.plan(self.dwell(len(batch)), self.perform_load_many)
+        return batch[0][1]
+
+    def perform_load_many(self):
+        """ proceed loading the batch of cargo from current pos """
+        batch = self.cart.data
+        self.cart.finish_loading_many()
+        for cargo_req, slot in batch:
+            self.requests.remove(cargo_req)
+            self.cancel_deadlines(cargo_req)
+            if self.tracer is not None:
+                self.tracer.loaded(self.time(), slot, cargo_req)
+            if self.bus is not None:
+                self.bus.loaded(self.time(), slot, cargo_req)
+        self.plan(0, self.heartbeat)
+
     def sched_move(self, track):
         """ schedule a move """
         self.cart.start_moving(track.dst)
+        if self.tracer is not None:
+            self.tracer.move(self.time(), self.cart.pos, track)
         self.plan(track.cost, self.perform_move)
 
     def perform_move(self):
         """ move has been done """
         self.cart.finish_moving()
+        if self.tracer is not None:
+            self.tracer.moved(self.time(), self.cart.pos)
+        if self.bus is not None:
+            self.bus.moved(self.time())
         self.plan(0, self.heartbeat)
 
     def find_load_there_single(self, priority=False):
         """
         Finds a single slot and requests that fits to together.
-        Returns a pair of free_slot_idx and request_idx, or (-1,-1) otherwise.
+        Returns a pair of free_slot_idx and request, or (-1, None) otherwise.
         """
         free_slot = self.cart.get_free_slot()
         if free_slot == -1:
             # no free slot
-            return -1, -1
+            return -1, None
         free_cap = self.cart.load_capacity - self.cart.load_sum()
         if free_cap <= 0:
             # no free capacity
-            return -1, -1
-        for request_idx in range(len(self.requests)):
-            request = self.requests[request_idx]
+            return -1, None
+        if priority and self.status != Status.UnloadOnly:
+            return -1, None
+        for request in self.requests.tier(self.status == Status.UnloadOnly):
             if request.weight <= free_cap:
-                if priority:
-                    if self.status == Status.UnloadOnly and request.prio:
-                        return free_slot, request_idx
-                else:
-                    if (self.status == Status.UnloadOnly and request.prio) or \
-                            (self.status != Status.UnloadOnly and not request.prio):
-                        return free_slot, request_idx
-        return -1, -1
-
-    def sort_requests(self):
-        """ sorts requests wrt. priority """
-        self.requests.sort(key=lambda i: (1 - i.prio) * 10 ** 6 + i.born, reverse=True)
+                return free_slot, request
+        return -1, None
+
+    def add_deadlines(self, cargo_req):
+        """ registers the promotion deadline of a new request """
+        if not cargo_req.prio:
+            self.deadlines[cargo_req] = (
+                self.push_deadline(self.promotions, cargo_req.born + self.PROMOTE_AFTER, cargo_req),
+            )
+
+    def next_deadline(self):
+        """ returns time of the next promotion, or None """
+        return self.peek_deadline(self.promotions)
+
+    def push_deadline(self, heap, deadline, cargo_req):
+        """ pushes a deadline of the request to the heap, returns its entry """
+        entry = [deadline, self.sequence, cargo_req]
+        self.sequence += 1
+        heapq.heappush(heap, entry)
+        return entry
+
+    @staticmethod
+    def peek_deadline(heap):
+        """ returns the earliest deadline of the heap which is not cancelled, or None """
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+        return heap[0][0] if heap else None
+
+    def cancel_deadlines(self, cargo_req):
+        """ cancels the deadlines of a request which is no more waiting """
+        for entry in self.deadlines.pop(cargo_req, ()):
+            entry[-1] = None
 
     def update_prio_requests(self):
-        """ update prio in each of requests if it waits too long """
+        """ update prio of the requests whose promotion deadline has passed """
         curr_time = self.time()
-        for cargo_req in self.requests:
-            if curr_time - cargo_req.born >= 60:
+        promotions = self.promotions
+        while promotions and promotions[0][0] <= curr_time:
+            cargo_req = heapq.heappop(promotions)[-1]
+            if cargo_req is not None and not cargo_req.prio:
                 cargo_req.set_priority()
-        self.sort_requests()
+                self.requests.promote(cargo_req)
+                if self.tracer is not None:
+                    self.tracer.promote(curr_time, cargo_req)
+                if self.bus is not None:
+                    self.bus.promoted(curr_time, cargo_req)
 
     def find_prio_request(self):
         """ return prioritized Load waiting in requests, or None. """
-        for cargo_req in self.requests:
-            if cargo_req.prio:
-                return cargo_req
-        return None
+        return self.requests.first(True)
 
     def heartbeat(self):
         """ main controlling loop """
@@ -160,12 +324,12 @@ class CartCtl:
             self.status = Status.UnloadOnly
         else:
             self.status = Status.Normal
-        slot = self.try_unload_here_single()
+        slot = self.try_unload_here_single() if self.dwell is None else self.try_unload_here_many()
         if slot != -1:
             # should be scheduled for unloading
             return
         if self.status != Status.UnloadOnly:
-            slot = self.try_load_here_single()
+            slot = self.try_load_here_single() if self.dwell is None else self.try_load_here_many()
             if slot != -1:
                 # should be scheduled for loading
                 return
@@ -173,10 +337,9 @@ class CartCtl:
         # nothing for load or unload at this station
 
         #    if just a single slot is available, and in prio -> 1 step of move
-        (free_slot, request_idx) = self.find_load_there_single(True)
+        (free_slot, request) = self.find_load_there_single(True)
         if free_slot >= 0:
             # found somewhere, let's go there!
-            request = self.requests[request_idx]
             path = self.tracks.get_path(self.cart.pos, request.src)
             if path:
                 self.sched_move(path[0])
@@ -184,49 +347,60 @@ class CartCtl:
 
         # try move with cargo to destination
         if not self.cart.empty():
-            paths = self.evaluate_all_paths()
-            fast_candidate_idx = CartCtl.find_fastest_slot(paths)
-            assert fast_candidate_idx is not None
-            first_track = paths[fast_candidate_idx][0]
+            first_track = self.find_fastest_track()
+            assert first_track is not None
             self.sched_move(first_track)
             return
 
         # try move for a load to source
-        (free_slot, request_idx) = self.find_load_there_single(False)
+        (free_slot, request) = self.find_load_there_single(False)
         if free_slot >= 0:
             # found somewhere, let's go there!
-            request = self.requests[request_idx]
             path = self.tracks.get_path(self.cart.pos, request.src)
             if path:
                 self.sched_move(path[0])
                 return
 
-        print('Do not know what to do at time %s' % self.time())
+        if logger.isEnabledFor(logging.INFO):
+            logger.info('Do not know what to do at time %s', self.time(),
+                        extra={'event': 'idle', 'time': self.time(), 'pos': self.cart.pos,
+                               'requests': len(self.requests)})
         self.status = Status.Idle
+        deadline = self.next_deadline() if self.idle_wakeup else None
+        if deadline is not None:
+            # nothing to do until a request ages
+            self.wake_up(deadline - self.time())
+
+    def wake_up(self, delay):
+        """ plans a heartbeat of the idle controller, unless one is planned sooner """
+        when = self.time() + delay
+        if self.wakeup is not None and self.wakeup <= when:
+            return
+        self.wakeup = when
+        self.plan(delay, self.idle_heartbeat, (when,))
 
-    def evaluate_all_paths(self):
-        """ finds all paths for all cargo """
-        paths = [self.tracks.get_path(self.cart.pos, l.dst) if l else None
-                 for l in self.cart.slots]
-        return paths
-
-    @staticmethod
-    def eval_cost(path):
-        """ calculate the cost of the path """
-        sum_cost = 0
-        for track in path:
-            sum_cost += track.cost
-        return sum_cost
+    def idle_heartbeat(self, when):
+        """ heartbeat of the idle controller, if this wake-up is still the planned one """
+        if self.wakeup != when or self.status != Status.Idle:
+            return
+        self.wakeup = None
+        self.heartbeat()
 
-    @staticmethod
-    def find_fastest_slot(paths):
-        """ finds index of the occupied slot with shortest destination """
-        costs = [CartCtl.eval_cost(path) if path else None for path in paths]
-        minidx = None
-        for idx in range(len(costs)):
-            if costs[idx] is not None:
-                if minidx is None:
-                    minidx = idx
-                elif costs[idx] < costs[minidx]:
-                    minidx = idx
-        return minidx
+    def find_fastest_track(self):
+        """
+        Finds the first track towards the nearest destination of all cargo,
+        by a single search from the current position. Returns None if
+        there is no such track.
+        """
+        routes = self.tracks.costs_from(self.cart.pos)
+        fastest = None
+        for cargo_req in self.cart.slots:
+            if cargo_req is None:
+                continue
+            route = routes.get(cargo_req.dst)
+            if route is None or route.track is None:
+                # unreachable or already there
+                continue
+            if fastest is None or route.cost < fastest.cost:
+                fastest = route
+        return fastest.track if fastest else None
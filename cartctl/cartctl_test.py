@@ -8,8 +8,9 @@
 import unittest
 
 from cart import Cart, CargoReq, Status as CartStatus, CartError
-from cartctl import CartCtl, Status as CartCtlStatus, LongPrioRequestError
-from jarvisenv import Jarvis
+from cartctl import CartCtl, Dwell, Status as CartCtlStatus, LongPrioRequestError
+from factory import Track, Tracks
+from jarvisenv import Jarvis, JarvisEnv
 
 
 class TestCartRequests(unittest.TestCase):
@@ -934,6 +935,190 @@ class TestCartRequests(unittest.TestCase):
         self.assertEqual('unloaded', foo.context)
         self.assertEqual(cart.pos, 'A')
 
+    def test_unreachable_request(self) -> None:
+        """ A test with requests which can never be served. """
+
+        class Islands(Jarvis):
+            """ Jarvis with an extra pair of stations not connected to the rest. """
+
+            TRACKS = Tracks(Jarvis.LAYOUT + [
+                Track('E', 'F', 10),
+                Track('F', 'E', 10),
+            ])
+
+            @staticmethod
+            def get_tracks():
+                """ returns all the Islands tracks """
+                return Islands.TRACKS
+
+        # setup cart
+        cart = Cart(1, 150, 0)
+
+        # setup cart controller
+        cart_ctl = CartCtl(cart, Islands)
+
+        # exercise + verify direct output
+        with self.assertLogs('cartctl', 'WARNING') as logs:
+            self.assertFalse(cart_ctl.request(CargoReq('E', 'F', 10, 'foo')))
+            self.assertFalse(cart_ctl.request(CargoReq('A', 'E', 10, 'bar')))
+        self.assertEqual(2, len(logs.records))
+        self.assertEqual(['unreachable'] * 2, [record.event for record in logs.records])
+        self.assertEqual(2, cart_ctl.rejected)
+        self.assertEqual(0, len(cart_ctl.requests))
+        self.assertEqual(CartCtlStatus.Idle, cart_ctl.status)
+
+        # a rejected request planned as an event does not stop the simulation
+        env = JarvisEnv(Islands.TRACKS)
+        cart_ctl = CartCtl(Cart(1, 150, 0), env)
+        helmet = CargoReq('A', 'B', 10, 'helmet')
+        helmet.onunload = lambda c, r: r.__setattr__('context', 'unloaded')
+        with self.assertLogs('cartctl', 'WARNING'):
+            env.plan(0, cart_ctl.request, (CargoReq('E', 'A', 10, 'foo'),))
+            env.plan(1, cart_ctl.request, (helmet,))
+            env.run()
+        self.assertEqual('unloaded', helmet.context)
+        self.assertEqual(1, cart_ctl.rejected)
+
+    def test_loaded_request_deadlines(self) -> None:
+        """ A test that loaded requests do not leave their aging deadlines behind. """
+        # setup cart
+        cart = Cart(1, 150, 0)
+
+        # setup cart controller
+        cart_ctl = CartCtl(cart, Jarvis)
+
+        # setup cargo to move + setup plan
+        foo = CargoReq('A', 'B', 50, 'foo')
+        bar = CargoReq('B', 'C', 50, 'bar')
+        Jarvis.plan(0, self.add_load, (cart_ctl, foo))
+        Jarvis.plan(1, self.add_load, (cart_ctl, bar))
+
+        # exercise
+        Jarvis.run()
+
+        # verify direct output
+        self.assertEqual('C', cart.pos)
+        self.assertTrue(cart.empty())
+        self.assertEqual({}, cart_ctl.deadlines)
+        self.assertTrue(all(entry[-1] is None for entry in cart_ctl.promotions))
+        self.assertFalse(foo.prio or bar.prio)
+
+    def test_idle_wakeup(self) -> None:
+        """ A test that the idle controller wakes up by itself, if asked to. """
+        for idle_wakeup in (False, True):
+            # setup environment, cart and cart controller
+            env = JarvisEnv()
+            cart = Cart(1, 50, 0)
+            cart_ctl = CartCtl(cart, env, idle_wakeup=idle_wakeup)
+
+            # setup cargo to move + setup plan
+            heavy = CargoReq('B', 'C', 100, 'heavy')
+            env.plan(0, cart_ctl.request, (heavy,))
+
+            # exercise
+            env.run(100)
+
+            # verify direct output: the heavy request waits, promoted only by a wake-up
+            self.assertEqual(idle_wakeup, heavy.prio)
+            self.assertEqual(CartCtlStatus.Idle, cart_ctl.status)
+
+        # requests at the same time while idle plan a single heartbeat
+        env = JarvisEnv()
+        cart = Cart(1, 50, 0)
+        cart_ctl = CartCtl(cart, env, idle_wakeup=True)
+        env.plan(5, cart_ctl.request, (CargoReq('A', 'B', 10, 'foo'),))
+        env.plan(5, cart_ctl.request, (CargoReq('A', 'C', 10, 'bar'),))
+        env.run()
+        self.assertTrue(cart.empty())
+        self.assertEqual([], list(cart_ctl.requests))
+        self.assertEqual('C', cart.pos)
+
+    def test_promote_after_override(self) -> None:
+        """ A test that a subclass of the controller may change the time to promote a request. """
+
+        class EagerCartCtl(CartCtl):
+            """ A controller promoting the requests early. """
+            PROMOTE_AFTER = 10
+
+        # setup environment, cart and cart controller
+        env = JarvisEnv()
+        cart = Cart(1, 50, 0)
+        cart_ctl = EagerCartCtl(cart, env, idle_wakeup=True)
+
+        # setup cargo to move + setup plan
+        heavy = CargoReq('B', 'C', 100, 'heavy')
+        env.plan(0, cart_ctl.request, (heavy,))
+
+        # exercise + verify direct output: promoted at the time of the subclass, not of CartCtl
+        env.run(9)
+        self.assertFalse(heavy.prio)
+        env.run(10)
+        self.assertTrue(heavy.prio)
+        self.assertEqual(60, CartCtl.PROMOTE_AFTER)
+
+    def test_batched_load_unload(self) -> None:
+        """ A test of loading and unloading all the cargo at a station in a single dwell. """
+        times = []
+        for dwell in (None, Dwell(), Dwell(2, 1)):
+            # setup environment, cart and cart controller
+            env = JarvisEnv()
+            cart = Cart(4, 150, 0)
+            cart_ctl = CartCtl(cart, env, idle_wakeup=True, dwell=dwell)
+            unloads = []
+
+            # setup cargo to move + setup plan
+            for content in ('foo', 'bar', 'baz'):
+                cargo_req = CargoReq('A', 'B', 40, content)
+                cargo_req.onunload = lambda c, r: unloads.append((env.time(), r.content))
+                env.plan(0, cart_ctl.request, (cargo_req,))
+            too_heavy = CargoReq('A', 'B', 40, 'qux')
+            env.plan(0, cart_ctl.request, (too_heavy,))
+
+            # exercise
+            env.run(32)
+
+            # verify direct output
+            self.assertEqual(['foo', 'bar', 'baz'], [content for _, content in unloads])
+            self.assertEqual([too_heavy], list(cart_ctl.requests))
+            times.append([when for when, _ in unloads])
+
+        # load 3x2 + move 20 + unload 3x2, or load 2 + move 20 + unload 2, or load 4 + move 20 + unload 4
+        self.assertEqual([[28, 30, 32], [24, 24, 24], [28, 28, 28]], times)
+
+    def test_independent_environments(self) -> None:
+        """ A test with simulations in separate environment instances. """
+
+        def add_load(env: JarvisEnv, cart_ctl: CartCtl, cargo_req: CargoReq) -> None:
+            """ A callback for schedulled load. """
+            self.log(f'{env.time()}: Requesting {cargo_req} at {cargo_req.src}')
+            cart_ctl.request(cargo_req)
+
+        # setup environments, carts and cart controllers
+        envs = [JarvisEnv(), JarvisEnv()]
+        carts = [Cart(1, 150, 0), Cart(1, 150, 0)]
+        cart_ctls = [CartCtl(cart, env) for cart, env in zip(carts, envs)]
+
+        # setup cargo to move + setup plan
+        cargo_reqs = [CargoReq('B', 'C', 50, 'foo'), CargoReq('D', 'A', 50, 'bar')]
+        for env, cart_ctl, cargo_req in zip(envs, cart_ctls, cargo_reqs):
+            env.plan(5, add_load, (env, cart_ctl, cargo_req))
+
+        # a track closed in one of the factories only
+        envs[1].get_tracks().remove_track('C', 'D')
+        envs[1].get_tracks().add_track(Track('A', 'D', 40))
+
+        # exercise
+        envs[0].run()
+        self.assertEqual(0, envs[1].time())
+        envs[1].run()
+
+        # verify direct output
+        self.assertEqual(['C', 'A'], [cart.pos for cart in carts])
+        self.assertTrue(all(cart.empty() for cart in carts))
+        self.assertEqual([49, 59], [env.time() for env in envs])
+        self.assertIsNot(envs[0].get_tracks(), envs[1].get_tracks())
+        self.assertEqual(0, Jarvis.time())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,130 @@
+"""
+Checkpoints of factory simulations.
+"""
+
+import io
+import os
+import pickle
+import struct
+
+import factory
+
+FILE_MAGIC = b'CTCP'
+# version 2: the controller keeps its waiting requests in a RequestQueue
+# version 3: the requests keep their trace_id
+FILE_VERSION = 3
+# magic, version, number of shared tracks
+FILE_HEADER = struct.Struct('<4sHH')
+
+
+class CheckpointError(Exception):
+    """ Exception for checkpoints which cannot be taken or restored """
+
+
+class CheckpointPickler(pickle.Pickler):
+    """
+    Pickler storing the shared tracks only as references, checked by their
+    digest when restored. The tracks are static and often big (with the
+    route table or a mapped file), so they are not part of the checkpoint.
+    """
+
+    def __init__(self, file, tracks):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.tracks = {id(shared): index for index, shared in enumerate(tracks)}
+        self.digests = {}
+
+    def persistent_id(self, obj):
+        if not isinstance(obj, factory.Tracks):
+            return None
+        index = self.tracks.get(id(obj))
+        if index is None:
+            raise CheckpointError('tracks %r are not shared with the checkpoint' % obj)
+        if index not in self.digests:
+            self.digests[index] = obj.digest()
+        return index, self.digests[index]
+
+
+class CheckpointUnpickler(pickle.Unpickler):
+    """ Unpickler resolving references to the shared tracks """
+
+    def __init__(self, file, tracks):
+        super().__init__(file)
+        self.tracks = list(tracks)
+        self.checked = set()
+
+    def persistent_load(self, pid):
+        index, digest = pid
+        if index >= len(self.tracks):
+            raise CheckpointError('missing shared tracks #%d' % index)
+        if index not in self.checked:
+            if self.tracks[index].digest() != digest:
+                raise CheckpointError('shared tracks #%d differ from the checkpoint' % index)
+            self.checked.add(index)
+        return self.tracks[index]
+
+
+def dump(state, file, tracks=()):
+    """
+    Writes a checkpoint of the state, any picklable objects such as a tuple
+    of the environment and the controllers, to a binary file object. All the
+    tracks the state refers to must be given; they are restored from load.
+    The call-backs of the state (e.g. CargoReq.onunload) must be picklable,
+    i.e. functions or methods of module level classes, not lambdas.
+    """
+    tracks = list(tracks)
+    file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, len(tracks)))
+    try:
+        CheckpointPickler(file, tracks).dump(state)
+    except (pickle.PicklingError, TypeError, AttributeError) as error:
+        raise CheckpointError('state cannot be checkpointed: %s' % error) from error
+
+
+def load(file, tracks=()):
+    """ reads a checkpoint from a binary file object, returns a copy of the state """
+    header = file.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        raise CheckpointError('truncated checkpoint')
+    magic, version, ntracks = FILE_HEADER.unpack(header)
+    if magic != FILE_MAGIC or version != FILE_VERSION:
+        raise CheckpointError('not a checkpoint of version %d' % FILE_VERSION)
+    if ntracks != len(tracks):
+        raise CheckpointError('checkpoint shares %d tracks, %d given' % (ntracks, len(tracks)))
+    try:
+        return CheckpointUnpickler(file, tracks).load()
+    except (pickle.UnpicklingError, EOFError) as error:
+        raise CheckpointError('corrupt or truncated checkpoint: %s' % error) from error
+
+
+def dumps(state, tracks=()):
+    """ returns a checkpoint of the state as bytes """
+    data = io.BytesIO()
+    dump(state, data, tracks)
+    return data.getvalue()
+
+
+def loads(data, tracks=()):
+    """ returns a copy of the state from a checkpoint in bytes """
+    return load(io.BytesIO(data), tracks)
+
+
+def save(state, filename, tracks=()):
+    """ saves a checkpoint of the state to a file, replaced atomically """
+    tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+    try:
+        with open(tmp_filename, 'wb') as output:
+            dump(state, output, tracks)
+        os.replace(tmp_filename, filename)
+    finally:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+
+
+def restore(filename, tracks=()):
+    """ returns a copy of the state from a checkpoint file """
+    with open(filename, 'rb') as checkpoint_file:
+        return load(checkpoint_file, tracks)
+
+
+def fork(state, tracks=()):
+    """ returns an independent copy of the state, to branch the simulation """
+    return loads(dumps(state, tracks), tracks)
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Simulation checkpoints testing.
+
+import os
+import tempfile
+import unittest
+
+import checkpoint
+from cart import Cart, CargoReq
+from cartctl import CartCtl
+from factory import Track, Tracks
+from jarvisenv import Jarvis, JarvisEnv
+from workload import Workload
+
+
+class Client:
+    """ A picklable client recording the unloads of its requests. """
+
+    def __init__(self, env: JarvisEnv, cart_ctl: CartCtl) -> None:
+        self.env = env
+        self.cart_ctl = cart_ctl
+        self.unloads = []
+
+    def request(self, cargo_req: CargoReq) -> None:
+        """ Hands the request over to the controller. """
+        cargo_req.onunload = self.unloaded
+        self.cart_ctl.request(cargo_req)
+
+    def unloaded(self, cart_dev: Cart, cargo_req: CargoReq) -> None:
+        """ Records the unload. """
+        self.unloads.append((self.env.time(), cargo_req.content))
+
+
+class TestCheckpoint(unittest.TestCase):
+    """ A test suite for checkpoints of simulations. """
+
+    def setUp(self) -> None:
+        """ The set-up phase for each test method in the class. """
+        super().setUp()
+        self.tracks = Tracks(Jarvis.LAYOUT)
+        self.env = JarvisEnv(self.tracks)
+        self.client = Client(self.env, CartCtl(Cart(4, 150), self.env))
+        Workload(self.tracks.stations(), seed=7, interval=100).feed(self.env, self.client.request, 20)
+
+    def test_resume(self) -> None:
+        """ A restored simulation continues exactly as the original one. """
+        self.env.run(500)
+        data = checkpoint.dumps(self.client, [self.tracks])
+        self.env.run()
+        restored = checkpoint.loads(data, [self.tracks])
+        self.assertIs(self.tracks, restored.env.get_tracks())
+        self.assertEqual(500, restored.env.time())
+        self.assertLess(len(restored.unloads), len(self.client.unloads))
+        restored.env.run()
+        self.assertEqual(self.client.unloads, restored.unloads)
+        self.assertEqual(self.client.cart_ctl.cart.pos, restored.cart_ctl.cart.pos)
+
+    def test_fork(self) -> None:
+        """ Forks are independent branches of the simulation. """
+        self.env.run(300)
+        branch = checkpoint.fork(self.client, [self.tracks])
+        branch.request(CargoReq('A', 'D', 10, 'extra'))
+        branch.env.run()
+        self.env.run()
+        self.assertIn('extra', [content for _, content in branch.unloads])
+        self.assertNotIn('extra', [content for _, content in self.client.unloads])
+
+    def test_file(self) -> None:
+        """ Checkpoint files are checked against the shared tracks. """
+        self.env.run(200)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'jarvis.ckpt')
+            checkpoint.save(self.client, filename, [self.tracks])
+            self.assertEqual(200, checkpoint.restore(filename, [self.tracks]).env.time())
+            self.assertEqual(200, checkpoint.restore(filename, [Tracks(Jarvis.LAYOUT)]).env.time())
+            other = Tracks(Jarvis.LAYOUT + [Track('A', 'C', 5)])
+            self.assertRaises(checkpoint.CheckpointError, checkpoint.restore, filename, [other])
+            self.assertRaises(checkpoint.CheckpointError, checkpoint.restore, filename, [])
+            # truncated body of the checkpoint
+            with open(filename, 'rb') as checkpoint_file:
+                data = checkpoint_file.read()
+            with open(filename, 'wb') as checkpoint_file:
+                checkpoint_file.write(data[:len(data) // 2])
+            self.assertRaises(checkpoint.CheckpointError, checkpoint.restore, filename, [self.tracks])
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.loads, data[:checkpoint.FILE_HEADER.size],
+                          [self.tracks])
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.loads,
+                          data[:checkpoint.FILE_HEADER.size] + b'\xff' * 16, [self.tracks])
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.loads, b'CTRT\x01\x00\x00\x00')
+        # checkpoints of the controller with a list of the requests
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.loads, b'CTCP\x01\x00\x01\x00')
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.dumps, self.client, [])
+        self.client.cart_ctl.cart.onmove = lambda cart_dev: None
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.dumps, self.client, [self.tracks])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Event bus of the cart controller notifications.
+"""
+
+import enum
+from collections import namedtuple
+
+
+class Topic(enum.Enum):
+    """ Topics of the notifications """
+
+    Moved = 0
+    Loaded = 1
+    Unloaded = 2
+    Promoted = 3
+    Expired = 4  # a request waits too long, the controller raises right after
+
+
+# cargo_req is None and slot is -1 if the event is not about a cargo
+Event = namedtuple('Event', ['time', 'topic', 'pos', 'slot', 'cargo_req'])
+
+
+class EventBus:
+    """
+    Notifications of a controller delivered to subscribers registered once
+    for their topics, instead of wrapping the call-backs of every request
+    and cart. The events are buffered and each subscriber gets a list of its
+    events in a batch per simulation time, after the controller events
+    already planned for that time (events published after the dispatch are
+    dispatched in another batch). The bus is set as CartCtl.bus only while it
+    has subscribers, so otherwise the controller pays a single check for None.
+    """
+
+    def __init__(self, cart_ctl, factory):
+        self.cart_ctl = cart_ctl
+        self.plan = factory.plan
+        # topic -> subscribers in the order of subscription
+        self.subscribers = {topic: [] for topic in Topic}
+        self.pending = []
+
+    def subscribe(self, handler, *topics):
+        """ handler(events) gets lists of the events of the topics (all by default) """
+        for topic in topics or Topic:
+            if handler not in self.subscribers[topic]:
+                self.subscribers[topic].append(handler)
+        self.cart_ctl.bus = self
+
+    def unsubscribe(self, handler, *topics):
+        """ stops notifications of the handler about the topics (all by default) """
+        for topic in topics or Topic:
+            if handler in self.subscribers[topic]:
+                self.subscribers[topic].remove(handler)
+        if not any(self.subscribers.values()) and self.cart_ctl.bus is self:
+            self.cart_ctl.bus = None
+
+    def publish(self, time, topic, slot=-1, cargo_req=None):
+        """ buffers an event at the current position of the cart """
+        if not self.pending:
+            self.plan(0, self.dispatch)
+        self.pending.append(Event(time, topic, self.cart_ctl.cart.pos, slot, cargo_req))
+
+    def dispatch(self):
+        """ delivers the buffered events to the subscribers """
+        events, self.pending = self.pending, []
+        batches = {}
+        for event in events:
+            for handler in self.subscribers[event.topic]:
+                batch = batches.get(handler)
+                if batch is None:
+                    batches[handler] = batch = []
+                batch.append(event)
+        for handler, batch in batches.items():
+            handler(batch)
+
+    def moved(self, time):
+        """ the cart has arrived at a station """
+        self.publish(time, Topic.Moved)
+
+    def loaded(self, time, slot, cargo_req):
+        """ a cargo has been loaded to the slot """
+        self.publish(time, Topic.Loaded, slot, cargo_req)
+
+    def unloaded(self, time, slot, cargo_req):
+        """ a cargo has been unloaded from the slot """
+        self.publish(time, Topic.Unloaded, slot, cargo_req)
+
+    def promoted(self, time, cargo_req):
+        """ a waiting request has got priority """
+        self.publish(time, Topic.Promoted, cargo_req=cargo_req)
+
+    def expired(self, time, cargo_req):
+        """ a request waits too long, dispatched at once as the controller stops """
+        self.publish(time, Topic.Expired, cargo_req=cargo_req)
+        self.dispatch()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Event bus of the controller notifications testing.
+
+import unittest
+
+from cart import Cart, CargoReq
+from cartctl import CartCtl, Dwell
+from eventbus import EventBus, Topic
+from jarvisenv import JarvisEnv
+
+
+class TestEventBus(unittest.TestCase):
+    """ A test suite for the event bus of the controller notifications. """
+
+    def setUp(self) -> None:
+        """ The set-up phase for each test method in the class. """
+        super().setUp()
+        self.env = JarvisEnv()
+        self.cart_ctl = CartCtl(Cart(2, 150), self.env, idle_wakeup=True, dwell=Dwell())
+        self.bus = EventBus(self.cart_ctl, self.env)
+        for cargo_req in (CargoReq('A', 'B', 20, 'helmet'), CargoReq('A', 'C', 40, 'heart'),
+                          CargoReq('B', 'A', 200, 'heavy')):
+            self.env.plan(0, self.cart_ctl.request, (cargo_req,))
+
+    def test_batches(self) -> None:
+        """ Subscribers get their events in a batch per time. """
+        batches = []
+        moves = []
+        self.bus.subscribe(lambda events: batches.append(
+            [(e.time, e.topic, e.pos, e.slot, e.cargo_req.content) for e in events]),
+            Topic.Loaded, Topic.Unloaded, Topic.Promoted)
+        self.bus.subscribe(lambda events: moves.extend((e.time, e.pos) for e in events), Topic.Moved)
+        self.env.run(100)
+        self.assertEqual([
+            [(2, Topic.Loaded, 'A', 0, 'helmet'), (2, Topic.Loaded, 'A', 1, 'heart')],
+            [(24, Topic.Unloaded, 'B', 0, 'helmet')],
+            [(46, Topic.Unloaded, 'C', 1, 'heart')],
+            [(60, Topic.Promoted, 'C', -1, 'heavy')],
+        ], batches)
+        self.assertEqual([(22, 'B'), (44, 'C')], moves)
+
+    def test_unsubscribe(self) -> None:
+        """ Without subscribers, the bus is detached from the controller. """
+        events = []
+        self.assertIsNone(self.cart_ctl.bus)
+        self.bus.subscribe(events.extend)
+        self.assertIs(self.bus, self.cart_ctl.bus)
+        self.env.run(23)
+        self.bus.unsubscribe(events.extend, Topic.Moved)
+        self.assertIs(self.bus, self.cart_ctl.bus)
+        self.bus.unsubscribe(events.extend)
+        self.assertIsNone(self.cart_ctl.bus)
+        self.env.run(100)
+        self.assertEqual([Topic.Loaded, Topic.Loaded, Topic.Moved], [e.topic for e in events])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""
+Discrete-event kernel for factory simulations.
+"""
+
+import heapq
+
+
+class EventKernel:
+    """
+    Discrete-event kernel with integer time. Events of the same time are kept
+    in a FIFO bucket, so planning an event for now (a zero delay, as most of
+    the controller events) is a plain append, and a whole bucket is drained
+    in a single loop. The heap holds only distinct future times.
+    """
+
+    def __init__(self):
+        self.now = 0
+        # heap of the times with a bucket
+        self.times = []
+        # time -> list of (action, argument, kwargs) in FIFO order
+        self.buckets = {}
+        # emptied bucket lists for reuse
+        self.free = []
+        # number of executed events
+        self.executed = 0
+
+    def schedule(self, delay, action, argument=(), kwargs={}):
+        """ plans action(*argument, **kwargs) to be executed after the delay """
+        when = self.now + delay
+        bucket = self.buckets.get(when)
+        if bucket is None:
+            bucket = self.free.pop() if self.free else []
+            self.buckets[when] = bucket
+            heapq.heappush(self.times, when)
+        bucket.append((action, argument, kwargs))
+
+    def empty(self):
+        """ returns True if there is no event planned """
+        return not self.times
+
+    def next_time(self):
+        """ returns time of the next event, or None if there is none """
+        return self.times[0] if self.times else None
+
+    def step(self):
+        """
+        Jumps to the time of the next event and executes all the events of
+        that time, including the ones planned meanwhile with no delay.
+        Returns False if there was no event.
+        """
+        if not self.times:
+            return False
+        when = self.times[0]
+        self.now = when
+        bucket = self.buckets[when]
+        i = 0
+        try:
+            while i < len(bucket):
+                action, argument, kwargs = bucket[i]
+                i += 1
+                action(*argument, **kwargs)
+        finally:
+            self.executed += i
+            if i < len(bucket):
+                # an event has raised, keep the rest for later
+                del bucket[:i]
+            else:
+                heapq.heappop(self.times)
+                del self.buckets[when]
+                bucket.clear()
+                self.free.append(bucket)
+        return True
+
+    def advance(self, when):
+        """
+        moves the time forward to when, e.g. to a clock outside of the events;
+        it cannot move past the next planned event, nor backwards
+        """
+        if self.times and when > self.times[0]:
+            raise ValueError('cannot advance to %s past the event planned at %s' % (when, self.times[0]))
+        if when > self.now:
+            self.now = when
+
+    def run(self, until=None):
+        """
+        Executes the events in the order of their time, then of planning.
+        With until, stops before the first event planned after it and moves
+        the time to until.
+        """
+        while self.times and (until is None or self.times[0] <= until):
+            self.step()
+        if until is not None:
+            self.advance(until)
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Discrete-event kernel testing.
+
+import unittest
+
+from eventkernel import EventKernel
+
+
+class TestEventKernel(unittest.TestCase):
+    """ A test suite for the discrete-event kernel. """
+
+    def setUp(self) -> None:
+        """ The set-up phase for each test method in the class. """
+        super().setUp()
+        self.kernel = EventKernel()
+        self.trace = []
+
+    def record(self, name: str) -> None:
+        """ An event recording its name and time. """
+        self.trace.append((self.kernel.now, name))
+
+    def test_order(self) -> None:
+        """ Events run in the order of time, then in the order of planning. """
+        self.kernel.schedule(10, self.record, ('a',))
+        self.kernel.schedule(5, self.record, ('b',))
+        self.kernel.schedule(10, self.record, ('c',))
+        self.kernel.schedule(0, self.record, kwargs={'name': 'd'})
+        self.kernel.run()
+        self.assertEqual([(0, 'd'), (5, 'b'), (10, 'a'), (10, 'c')], self.trace)
+        self.assertEqual(10, self.kernel.now)
+        self.assertTrue(self.kernel.empty())
+        self.assertEqual(4, self.kernel.executed)
+
+    def test_zero_delay(self) -> None:
+        """ Events planned with no delay run after the already planned ones. """
+
+        def chain(name: str) -> None:
+            self.record(name)
+            if len(name) < 3:
+                self.kernel.schedule(0, chain, (name + '+',))
+
+        self.kernel.schedule(1, chain, ('a',))
+        self.kernel.schedule(1, self.record, ('b',))
+        self.kernel.schedule(2, self.record, ('c',))
+        self.assertTrue(self.kernel.step())
+        self.assertEqual([(1, 'a'), (1, 'b'), (1, 'a+'), (1, 'a++')], self.trace)
+        self.assertEqual(2, self.kernel.next_time())
+        self.assertTrue(self.kernel.step())
+        self.assertFalse(self.kernel.step())
+
+    def test_run_until(self) -> None:
+        """ Run stops before events planned after the given time. """
+        for when in (5, 10, 15):
+            self.kernel.schedule(when, self.record, (str(when),))
+        self.kernel.run(12)
+        self.assertEqual([(5, '5'), (10, '10')], self.trace)
+        self.assertEqual(12, self.kernel.now)
+        self.kernel.schedule(1, self.record, ('13',))
+        self.kernel.run()
+        self.assertEqual([(13, '13'), (15, '15')], self.trace[2:])
+
+    def test_advance(self) -> None:
+        """ The time moves forward up to the next planned event. """
+        self.kernel.schedule(10, self.record, ('10',))
+        self.kernel.advance(4)
+        self.kernel.advance(2)
+        self.assertEqual(4, self.kernel.now)
+        self.assertRaises(ValueError, self.kernel.advance, 11)
+        self.kernel.advance(10)
+        self.kernel.run()
+        self.assertEqual([(10, '10')], self.trace)
+
+    def test_exception(self) -> None:
+        """ Events after a failed one stay planned. """
+
+        def fail() -> None:
+            raise ValueError('failed')
+
+        self.kernel.schedule(1, self.record, ('a',))
+        self.kernel.schedule(1, fail)
+        self.kernel.schedule(1, self.record, ('b',))
+        self.assertRaises(ValueError, self.kernel.run)
+        self.kernel.run()
+        self.assertEqual([(1, 'a'), (1, 'b')], self.trace)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,235 @@
+"""
+Binary traces of the cart controller events.
+"""
+
+import enum
+import struct
+from collections import namedtuple
+
+FILE_MAGIC = b'CTTR'
+FILE_VERSION = 3
+# magic, version, size of a record
+FILE_HEADER = struct.Struct('<4sHH')
+# time, kind, slot, src, dst, content, request, weight (or cost, or length of a string);
+# time and weight are doubles, as tracks may have fractional costs (see factory.parse_cost)
+RECORD = struct.Struct('<dBbxxiiiid')
+# no station, no content, no request
+NONE = -1
+
+
+class Kind(enum.IntEnum):
+    """ Kinds of the trace records """
+
+    String = 0  # a new string of the string table, its bytes follow
+    Request = 1
+    Promote = 2
+    Move = 3  # scheduled move
+    Moved = 4
+    Load = 5  # scheduled load
+    Loaded = 6
+    Unload = 7  # scheduled unload
+    Unloaded = 8
+
+
+# plain ints of the kinds, packed faster than the enum
+REQUEST, PROMOTE, MOVE, MOVED, LOAD, LOADED, UNLOAD, UNLOADED = (kind.value for kind in list(Kind)[1:])
+
+Event = namedtuple('Event', ['time', 'kind', 'slot', 'src', 'dst', 'content', 'req', 'weight'])
+
+TraceStats = namedtuple('TraceStats', ['events', 'counts', 'distance', 'delivered', 'mean_latency',
+                                       'max_latency', 'end'])
+
+
+class TraceError(Exception):
+    """ Exception for broken trace files """
+
+
+class StringTable(dict):
+    """ Indexes of the strings of a trace, a new string is written on the first use """
+
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+        self[None] = NONE
+
+    def __missing__(self, value):
+        index = len(self) - 1
+        self[value] = index
+        self.writer.write_string(index, str(value))
+        return index
+
+
+class TraceWriter:
+    """
+    Opt-in recorder of the controller events (set as CartCtl.tracer) to an
+    append-only binary file of fixed-size records. Stations and contents
+    are written once to a string table interleaved with the records and
+    then referred to by their index. Each request gets a number in the
+    trace, as contents need not be unique, which is kept in its trace_id
+    and written with all its records. Records are packed into a buffer
+    which is written when full.
+    """
+
+    def __init__(self, file, buffer_records=8192):
+        """ file is a binary file object open for writing """
+        self.file = file
+        self.strings = StringTable(self)
+        self.buffer = bytearray(RECORD.size * buffer_records)
+        self.offset = 0
+        self.requests = 0
+        self.file.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, RECORD.size))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write_string(self, index, value):
+        """ writes a string of the string table with its bytes """
+        data = value.encode()
+        self.record(0, Kind.String.value, NONE, index, NONE, NONE, NONE, len(data))
+        self.flush()
+        self.file.write(data + bytes(-len(data) % RECORD.size))
+
+    def record(self, time, kind, slot, src, dst, content, req, weight):
+        """ appends a single record, stations and contents are string indexes, req is the number of the request """
+        offset = self.offset
+        if offset == len(self.buffer):
+            self.flush()
+            offset = 0
+        RECORD.pack_into(self.buffer, offset, time, kind, slot, src, dst, content, req, weight)
+        self.offset = offset + RECORD.size
+
+    def request(self, time, cargo_req):
+        """ a new request, numbered in the trace """
+        strings = self.strings
+        cargo_req.trace_id = req = self.requests
+        self.requests = req + 1
+        self.record(time, REQUEST, NONE, strings[cargo_req.src], strings[cargo_req.dst],
+                    strings[cargo_req.content], req, cargo_req.weight)
+
+    def promote(self, time, cargo_req):
+        """ a request has become prioritised """
+        self.record(time, PROMOTE, NONE, NONE, NONE, self.strings[cargo_req.content], cargo_req.trace_id,
+                    cargo_req.weight)
+
+    def move(self, time, src, track):
+        """ a move along the track has been scheduled """
+        strings = self.strings
+        self.record(time, MOVE, NONE, strings[src], strings[track.dst], NONE, NONE, track.cost)
+
+    def moved(self, time, pos):
+        """ a move has finished """
+        self.record(time, MOVED, NONE, NONE, self.strings[pos], NONE, NONE, 0)
+
+    def load(self, time, slot, cargo_req):
+        """ a load to the slot has been scheduled """
+        strings = self.strings
+        self.record(time, LOAD, slot, strings[cargo_req.src], NONE, strings[cargo_req.content], cargo_req.trace_id,
+                    cargo_req.weight)
+
+    def loaded(self, time, slot, cargo_req):
+        """ a load has finished """
+        strings = self.strings
+        self.record(time, LOADED, slot, strings[cargo_req.src], NONE, strings[cargo_req.content], cargo_req.trace_id,
+                    cargo_req.weight)
+
+    def unload(self, time, slot, cargo_req):
+        """ an unload from the slot has been scheduled """
+        strings = self.strings
+        self.record(time, UNLOAD, slot, NONE, strings[cargo_req.dst], strings[cargo_req.content], cargo_req.trace_id,
+                    cargo_req.weight)
+
+    def unloaded(self, time, slot, cargo_req):
+        """ an unload has finished """
+        strings = self.strings
+        self.record(time, UNLOADED, slot, NONE, strings[cargo_req.dst], strings[cargo_req.content],
+                    cargo_req.trace_id, cargo_req.weight)
+
+    def flush(self):
+        """ writes the buffered records """
+        if self.offset:
+            self.file.write(memoryview(self.buffer)[:self.offset])
+            self.offset = 0
+
+    def close(self):
+        """ writes the buffered records and closes the file """
+        self.flush()
+        self.file.close()
+
+
+def read_trace(file, chunk_records=65536):
+    """
+    Yields Events of a trace from a binary file object, with strings
+    resolved. The file is read in chunks, so traces of any size can be
+    streamed.
+    """
+    header = file.read(FILE_HEADER.size)
+    if len(header) < FILE_HEADER.size:
+        raise TraceError('truncated trace')
+    magic, version, record_size = FILE_HEADER.unpack(header)
+    if magic != FILE_MAGIC or version != FILE_VERSION or record_size != RECORD.size:
+        raise TraceError('not a trace of version %d' % FILE_VERSION)
+    kinds = list(Kind)
+    strings = {NONE: None}
+    unpack_from = RECORD.unpack_from
+
+    pending = b''
+    while True:
+        chunk = file.read(RECORD.size * chunk_records)
+        if not chunk and not pending:
+            return
+        data = memoryview(pending + chunk) if pending else memoryview(chunk)
+        if not chunk:
+            raise TraceError('truncated trace')
+        offset = 0
+        end = len(data) - len(data) % RECORD.size
+        while offset < end:
+            time, kind, slot, src, dst, content, req, weight = unpack_from(data, offset)
+            offset += RECORD.size
+            if kind == Kind.String:
+                weight = int(weight)
+                size = weight + (-weight % RECORD.size)
+                if offset + size > len(data):
+                    # the string continues in the next chunk
+                    offset -= RECORD.size
+                    break
+                strings[src] = bytes(data[offset:offset + weight]).decode()
+                offset += size
+                continue
+            # integral values are ints, as the costs parsed from files
+            if time.is_integer():
+                time = int(time)
+            if weight.is_integer():
+                weight = int(weight)
+            yield Event(time, kinds[kind], slot, strings[src], strings[dst], strings[content], req, weight)
+        pending = bytes(data[offset:])
+
+
+def trace_stats(events):
+    """
+    Returns TraceStats of the events: number of events of each kind, the
+    distance travelled, number of delivered requests and their latencies
+    from the request to the unload, matched by the numbers of the requests.
+    """
+    counts = dict.fromkeys(Kind, 0)
+    born = {}
+    distance = delivered = latency_sum = max_latency = end = 0
+    nevents = 0
+    for event in events:
+        nevents += 1
+        counts[event.kind] += 1
+        end = event.time
+        if event.kind == Kind.Request:
+            born[event.req] = event.time
+        elif event.kind == Kind.Move:
+            distance += event.weight
+        elif event.kind == Kind.Unloaded:
+            delivered += 1
+            latency = event.time - born.pop(event.req, event.time)
+            latency_sum += latency
+            max_latency = max(max_latency, latency)
+    del counts[Kind.String]
+    return TraceStats(nevents, counts, distance, delivered, latency_sum / delivered if delivered else 0.0,
+                      max_latency, end)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Binary event traces testing.
+
+import io
+import unittest
+
+import eventtrace
+from cart import Cart, CargoReq
+from cartctl import CartCtl
+from factory import Track, Tracks
+from jarvisenv import JarvisEnv
+
+
+class TestTrace(unittest.TestCase):
+    """ A test suite for binary event traces. """
+
+    def test_controller(self) -> None:
+        """ A trace of a controller is replayed as its timeline. """
+        env = JarvisEnv()
+        cart_ctl = CartCtl(Cart(1, 150), env)
+        output = io.BytesIO()
+        output.close = lambda: None
+        cart_ctl.tracer = eventtrace.TraceWriter(output)
+        env.plan(0, cart_ctl.request, (CargoReq('A', 'B', 20, 'helmet'),))
+        env.run()
+        cart_ctl.tracer.close()
+        events = list(eventtrace.read_trace(io.BytesIO(output.getvalue())))
+        self.assertEqual([
+            eventtrace.Event(0, eventtrace.Kind.Request, -1, 'A', 'B', 'helmet', 0, 20),
+            eventtrace.Event(0, eventtrace.Kind.Load, 0, 'A', None, 'helmet', 0, 20),
+            eventtrace.Event(2, eventtrace.Kind.Loaded, 0, 'A', None, 'helmet', 0, 20),
+            eventtrace.Event(2, eventtrace.Kind.Move, -1, 'A', 'B', None, -1, 20),
+            eventtrace.Event(22, eventtrace.Kind.Moved, -1, None, 'B', None, -1, 0),
+            eventtrace.Event(22, eventtrace.Kind.Unload, 0, None, 'B', 'helmet', 0, 20),
+            eventtrace.Event(24, eventtrace.Kind.Unloaded, 0, None, 'B', 'helmet', 0, 20),
+        ], events)
+        stats = eventtrace.trace_stats(events)
+        self.assertEqual((7, 20, 1, 24.0, 24, 24), (stats.events, stats.distance, stats.delivered,
+                                                    stats.mean_latency, stats.max_latency, stats.end))
+        self.assertEqual(1, stats.counts[eventtrace.Kind.Move])
+
+    def test_same_contents(self) -> None:
+        """ Latencies of requests with the same content are of the right requests. """
+        env = JarvisEnv()
+        cart_ctl = CartCtl(Cart(1, 150), env)
+        output = io.BytesIO()
+        output.close = lambda: None
+        cart_ctl.tracer = eventtrace.TraceWriter(output)
+        first, second = CargoReq('A', 'B', 20, 'helmet'), CargoReq('A', 'B', 20, 'helmet')
+        env.plan(0, cart_ctl.request, (first,))
+        env.plan(5, cart_ctl.request, (second,))
+        env.run()
+        cart_ctl.tracer.close()
+        self.assertEqual((0, 1), (first.trace_id, second.trace_id))
+        events = list(eventtrace.read_trace(io.BytesIO(output.getvalue())))
+        self.assertEqual([(24, 0), (78, 1)],
+                         [(e.time, e.req) for e in events if e.kind == eventtrace.Kind.Unloaded])
+        stats = eventtrace.trace_stats(events)
+        self.assertEqual((2, 48.5, 73), (stats.delivered, stats.mean_latency, stats.max_latency))
+
+    def test_float_costs(self) -> None:
+        """ Fractional costs and times of the tracks are traced. """
+        env = JarvisEnv(Tracks([Track('A', 'B', 2.5), Track('B', 'A', 3)]))
+        cart_ctl = CartCtl(Cart(1, 150), env)
+        output = io.BytesIO()
+        output.close = lambda: None
+        cart_ctl.tracer = eventtrace.TraceWriter(output)
+        env.plan(0, cart_ctl.request, (CargoReq('A', 'B', 0.5, 'feather'),))
+        env.run()
+        cart_ctl.tracer.close()
+        events = list(eventtrace.read_trace(io.BytesIO(output.getvalue())))
+        self.assertEqual([
+            eventtrace.Event(0, eventtrace.Kind.Request, -1, 'A', 'B', 'feather', 0, 0.5),
+            eventtrace.Event(0, eventtrace.Kind.Load, 0, 'A', None, 'feather', 0, 0.5),
+            eventtrace.Event(2, eventtrace.Kind.Loaded, 0, 'A', None, 'feather', 0, 0.5),
+            eventtrace.Event(2, eventtrace.Kind.Move, -1, 'A', 'B', None, -1, 2.5),
+            eventtrace.Event(4.5, eventtrace.Kind.Moved, -1, None, 'B', None, -1, 0),
+            eventtrace.Event(4.5, eventtrace.Kind.Unload, 0, None, 'B', 'feather', 0, 0.5),
+            eventtrace.Event(6.5, eventtrace.Kind.Unloaded, 0, None, 'B', 'feather', 0, 0.5),
+        ], events)
+        self.assertIsInstance(events[0].weight, float)
+        self.assertIsInstance(events[2].time, int)
+
+    def test_streaming(self) -> None:
+        """ Long strings and records span the chunks of the reader. """
+        output = io.BytesIO()
+        writer = eventtrace.TraceWriter(output, buffer_records=3)
+        cargo = [CargoReq('A', 'B' * n, n + 1, 'x' * (7 * n)) for n in range(1, 40)]
+        for time, cargo_req in enumerate(cargo):
+            writer.request(time, cargo_req)
+        writer.flush()
+        data = output.getvalue()
+        events = list(eventtrace.read_trace(io.BytesIO(data), chunk_records=2))
+        self.assertEqual([(r.src, r.dst, r.content, r.weight) for r in cargo],
+                         [(e.src, e.dst, e.content, e.weight) for e in events])
+        self.assertRaises(eventtrace.TraceError, list, eventtrace.read_trace(io.BytesIO(data[:-5])))
+        self.assertRaises(eventtrace.TraceError, list, eventtrace.read_trace(io.BytesIO(b'CTCP' + data[4:])))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -2,7 +2,18 @@
 Factory + Track implementation with path finder
 """
 
-from collections import namedtuple
+import bisect
+import csv
+import hashlib
+import heapq
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict, namedtuple
 
 
 class Factory:
@@ -24,24 +35,192 @@ class Factory:
     def run():
         raise NotImplementedError
 
+    @staticmethod
+    def time():
+        raise NotImplementedError
+
 
 Track = namedtuple('Track', ['src', 'dst', 'cost'])
 
+# path with its cost, no more used by the search, kept for compatibility
 Pcost = namedtuple('PathCost', ['path', 'cost'])
 
 
+def parse_cost(text):
+    """ converts cost from a text to int, or float if it is not integral """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def file_format(filename, fmt):
+    """ returns the given format, or the one given by extension of the file """
+    if fmt is None:
+        fmt = os.path.splitext(filename)[1].lstrip('.').lower()
+    if fmt not in ('csv', 'jsonl'):
+        raise ValueError("unknown format of tracks: %s" % fmt)
+    return fmt
+
+
+def read_tracks(filename, fmt=None):
+    """
+    Streams tracks from a file, one by one. The format is 'csv' (rows of
+    src,dst,cost with an optional header) or 'jsonl' (objects with src, dst
+    and cost keys), by default given by the extension.
+    """
+    fmt = file_format(filename, fmt)
+    with open(filename, newline='') as input_file:
+        if fmt == 'csv':
+            for row in csv.reader(input_file):
+                if not row or row == ['src', 'dst', 'cost']:
+                    continue
+                yield Track(row[0], row[1], parse_cost(row[2]))
+        else:
+            for line in input_file:
+                if line.strip():
+                    record = json.loads(line)
+                    yield Track(record['src'], record['dst'], record['cost'])
+
+
+def write_tracks(tracks, filename, fmt=None):
+    """ streams tracks to a file in a format of read_tracks() """
+    fmt = file_format(filename, fmt)
+    with open(filename, "w", newline='') as output:
+        if fmt == 'csv':
+            writer = csv.writer(output)
+            writer.writerow(['src', 'dst', 'cost'])
+            writer.writerows(tracks)
+        else:
+            output.writelines(json.dumps(track._asdict()) + '\n' for track in tracks)
+
+
+def dijkstra(tracks, src, dst=None, heuristic=None):
+    """
+    Uniform cost search over a track map (src -> list of tracks) with a binary
+    heap and a closed set. Stops as soon as dst is closed, or explores all the
+    reachable stations if dst is None. With a consistent heuristic (station ->
+    lower bound of the cost to dst) it becomes A* search.
+    Returns maps station -> cost and station -> last track of the shortest
+    path (parent pointers), and the closed set. Costs are final for closed
+    stations only.
+    """
+    dist = {src: 0}
+    parent = {}
+    closed = set()
+    # (priority, insertion order, station) - the order keeps ties FIFO
+    openset = [(0, 0, src)]
+    order = 0
+    while openset:
+        _, _, station = heapq.heappop(openset)
+        if station in closed:
+            continue
+        closed.add(station)
+        if station == dst:
+            break
+        cost = dist[station]
+        for track in tracks.get(station, ()):
+            new_cost = cost + track.cost
+            if track.dst in closed:
+                continue
+            if track.dst not in dist or new_cost < dist[track.dst]:
+                dist[track.dst] = new_cost
+                parent[track.dst] = track
+                order += 1
+                priority = new_cost + heuristic(track.dst) if heuristic else new_cost
+                heapq.heappush(openset, (priority, order, track.dst))
+    return dist, parent, closed
+
+
+def csr_dijkstra(offsets, targets, costs, src, dst=-1, heuristic=None):
+    """
+    The same search as dijkstra() over compressed sparse rows of station
+    numbers. Returns list of costs (None if not reached), list of last edges
+    (-1 if none) and the closed stations as a bytearray.
+    """
+    nstations = len(offsets) - 1
+    dist = [None] * nstations
+    parent = [-1] * nstations
+    closed = bytearray(nstations)
+    dist[src] = 0
+    openset = [(0, 0, src)]
+    order = 0
+    while openset:
+        _, _, station = heapq.heappop(openset)
+        if closed[station]:
+            continue
+        closed[station] = 1
+        if station == dst:
+            break
+        cost = dist[station]
+        for edge in range(offsets[station], offsets[station + 1]):
+            target = targets[edge]
+            if closed[target]:
+                continue
+            new_cost = cost + costs[edge]
+            if dist[target] is None or new_cost < dist[target]:
+                dist[target] = new_cost
+                parent[target] = edge
+                order += 1
+                priority = new_cost + heuristic(target) if heuristic else new_cost
+                heapq.heappush(openset, (priority, order, target))
+    return dist, parent, closed
+
+
+def csr_build(nstations, srcs, dsts, costs):
+    """
+    Builds compressed sparse rows from parallel arrays of edges by a stable
+    counting sort. Returns offsets, targets and costs arrays.
+    """
+    offsets = array('l', [0]) * (nstations + 1)
+    for src in srcs:
+        offsets[src + 1] += 1
+    for i in range(nstations):
+        offsets[i + 1] += offsets[i]
+    fill = array('l', offsets[:-1])
+    targets = array('l', [0]) * len(srcs)
+    sorted_costs = array(costs.typecode, [0]) * len(srcs)
+    for src, dst, cost in zip(srcs, dsts, costs):
+        targets[fill[src]] = dst
+        sorted_costs[fill[src]] = cost
+        fill[src] += 1
+    return offsets, targets, sorted_costs
+
+
+def build_path(parent, src, dst):
+    """ reconstructs list of tracks from src to dst using parent pointers """
+    path = []
+    station = dst
+    while station != src:
+        track = parent[station]
+        path.append(track)
+        station = track.src
+    path.reverse()
+    return path
+
+
+def first_track(parent, first, src, dst):
+    """
+    Returns first track of the path src -> dst using parent pointers.
+    First tracks of the visited stations are memoized in the first map.
+    """
+    chain = []
+    station = dst
+    while station not in first:
+        track = parent[station]
+        if track.src == src:
+            first[station] = track
+            break
+        chain.append(station)
+        station = track.src
+    for station_on_path in chain:
+        first[station_on_path] = first[station]
+    return first[dst]
+
+
 def ucs(tracks, src, dst):
     """ unified cost search for path finding """
 
-    def min_idx(openset):
-        minidx = 0
-        i = 1
-        while i < len(openset):
-            if openset[i].cost < openset[minidx].cost:
-                minidx = i
-            i += 1
-        return minidx
-
     # asserts
     if src == dst:
         return []
@@ -50,32 +229,417 @@ def ucs(tracks, src, dst):
     if dst not in tracks:
         return []
 
-    # initialization
-    openset = []
-    for track in tracks[src]:
-        openset.append(Pcost([track], track.cost))
+    _, parent, _ = dijkstra(tracks, src, dst)
+    if dst not in parent:
+        # unreachable
+        return []
+    return build_path(parent, src, dst)
+
 
-    # search
-    while openset:
-        # pop shortest path
-        minidx = min_idx(openset)
-        pc = openset[minidx]
-        del openset[minidx]
+def strong_components(stations, successors):
+    """
+    Tarjan's algorithm without recursion. Successors(station) yields
+    stations reachable by a single track. Returns map station -> component
+    number and count of the components; the components are numbered in
+    reverse topological order (successors first).
+    """
+    index = {}
+    low = {}
+    component = {}
+    stack = []
+    on_stack = set()
+    count = 0
+    for root in stations:
+        if root in index:
+            continue
+        index[root] = low[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(successors(root)))]
+        while work:
+            station, succs = work[-1]
+            for succ in succs:
+                if succ not in index:
+                    index[succ] = low[succ] = len(index)
+                    stack.append(succ)
+                    on_stack.add(succ)
+                    work.append((succ, iter(successors(succ))))
+                    break
+                if succ in on_stack:
+                    low[station] = min(low[station], index[succ])
+            else:
+                work.pop()
+                if work:
+                    pred = work[-1][0]
+                    low[pred] = min(low[pred], low[station])
+                if low[station] == index[station]:
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component[member] = count
+                        if member == station:
+                            break
+                    count += 1
+    return component, count
+
+
+class Reachability:
+    """
+    Strongly connected components of the stations and reachability among
+    the components stored as bit sets. A query is a shift of the big int of
+    the source component, O(C / word size) for C components, which is small
+    compared to a search. The bit sets take O(C^2) bits when most of the
+    components are single stations, as in DAG-like layouts.
+    """
+
+    def __init__(self, stations, successors):
+        self.component, count = strong_components(stations, successors)
+        succ_components = [set() for _ in range(count)]
+        for station in stations:
+            for succ in successors(station):
+                succ_components[self.component[station]].add(self.component[succ])
+        # successors have lower numbers, so they are complete before use
+        self.reach = [0] * count
+        for comp in range(count):
+            reach = 1 << comp
+            for succ in succ_components[comp]:
+                reach |= self.reach[succ]
+            self.reach[comp] = reach
+
+    def reachable(self, src, dst):
+        """ returns True if there is a path src -> dst """
+        src_comp = self.component.get(src)
+        dst_comp = self.component.get(dst)
+        if src_comp is None or dst_comp is None:
+            return False
+        return bool(self.reach[src_comp] >> dst_comp & 1)
+
+
+class Landmarks:
+    """
+    ALT (A*, landmarks and triangle inequality) lower bounds: costs from and
+    to a few landmark stations. Each next landmark is the station farthest
+    from the already selected ones.
+    """
+
+    def __init__(self, stations, forward, backward, count):
+        """
+        Forward(station) and backward(station) return maps station -> cost
+        of the shortest path from and to the given station respectively.
+        """
+        self.landmarks = []
+        self.dist_from = []
+        self.dist_to = []
+        stations = list(stations)
+        # cost from the nearest landmark, stations missing here are the farthest
+        nearest = {}
+        landmark = stations[0] if stations else None
+        while landmark is not None and len(self.landmarks) < count:
+            self.landmarks.append(landmark)
+            dist_from = forward(landmark)
+            self.dist_from.append(dist_from)
+            self.dist_to.append(backward(landmark))
+            for station, cost in dist_from.items():
+                if station not in nearest or cost < nearest[station]:
+                    nearest[station] = cost
+            landmark = max(stations, key=lambda station: (station not in nearest, nearest.get(station, 0)))
+            if landmark in self.landmarks:
+                break
+
+    def heuristic(self, dst):
+        """ returns function station -> lower bound of the cost to dst """
+        bounds = [(dist_from, dist_from.get(dst), dist_to, dist_to.get(dst))
+                  for dist_from, dist_to in zip(self.dist_from, self.dist_to)]
+
+        def lower_bound(station):
+            bound = 0
+            for dist_from, from_to_dst, dist_to, dst_to_to in bounds:
+                # d(L, dst) - d(L, station) <= d(station, dst)
+                if from_to_dst is not None:
+                    cost = dist_from.get(station)
+                    if cost is not None and from_to_dst - cost > bound:
+                        bound = from_to_dst - cost
+                # d(station, L) - d(dst, L) <= d(station, dst)
+                if dst_to_to is not None:
+                    cost = dist_to.get(station)
+                    if cost is not None and cost - dst_to_to > bound:
+                        bound = cost - dst_to_to
+            return bound
+
+        return lower_bound
 
-        # are we finished?
-        last = pc.path[-1].dst
-        if last == dst:
-            return pc.path
-        # enroll it
-        for track in tracks[last]:
-            new_pc = Pcost(pc.path + [track], pc.cost + track.cost)
-            openset.append(new_pc)
+
+TableStats = namedtuple('TableStats', ['stations', 'seconds', 'bytes'])
+
+Route = namedtuple('Route', ['cost', 'track'])
+
+
+class RouteTable:
+    """
+    All pairs shortest paths of a track map: a distance table and a next-hop
+    matrix, both stored as flat n*n arrays indexed by station numbers.
+    """
+
+    # marks unreachable pairs in both of the tables
+    NONE = -1
+
+    # saved table: header, n*n distances, n*n next hops (in native byte order)
+    FILE_MAGIC = b'CTRT'
+    FILE_VERSION = 1
+    # magic, version, byte order, distance typecode, digest of the tracks, stations
+    FILE_HEADER = struct.Struct('<4sHcc32sQ16x')
+
+    def __init__(self, tracks):
+        start = time.perf_counter()
+        self._index_tracks(tracks)
+        n = len(self.names)
+        self.typecode = 'q' if all(isinstance(track.cost, int) for track in self.edges) else 'd'
+        self.dist = array(self.typecode, [RouteTable.NONE]) * (n * n)
+        self.next = array('i', [RouteTable.NONE]) * (n * n)
+        for i in range(n):
+            self.fill_row(tracks, i)
+        self._set_stats(start)
+
+    def _index_tracks(self, tracks):
+        """ numbers the stations and the tracks of the track map """
+        self.names = list(tracks)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # tracks referenced by the next-hop matrix, removed ones are None
+        self.edges = [track for src in self.names for track in tracks[src]]
+        self.edge_idx = {id(track): i for i, track in enumerate(self.edges)}
+
+    def _set_stats(self, start):
+        """ sets stats of the table built or loaded since start """
+        self.stats = TableStats(len(self.names), time.perf_counter() - start,
+                                self.dist.itemsize * len(self.dist) +
+                                self.next.itemsize * len(self.next))
+
+    def save(self, filename, digest):
+        """
+        Saves the table to a binary file for the tracks with the given digest.
+        The file is replaced atomically.
+        """
+        header = RouteTable.FILE_HEADER.pack(
+            RouteTable.FILE_MAGIC, RouteTable.FILE_VERSION, sys.byteorder[0].encode(),
+            self.typecode.encode(), digest, len(self.names))
+        tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmp_filename, "wb") as output:
+            output.write(header)
+            output.write(self.dist)
+            output.write(self.next)
+        os.replace(tmp_filename, filename)
+
+    @staticmethod
+    def load(tracks, filename, digest):
+        """
+        Maps a table saved for the track map into memory (copy on write).
+        Returns None if the file is missing, broken or saved for other tracks.
+        """
+        start = time.perf_counter()
+        try:
+            with open(filename, "rb") as table_file:
+                data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_COPY)
+        except (OSError, ValueError):
+            return None
+        header_size = RouteTable.FILE_HEADER.size
+        if len(data) < header_size:
+            return None
+        magic, version, byteorder, typecode, file_digest, n = RouteTable.FILE_HEADER.unpack_from(data)
+        if magic != RouteTable.FILE_MAGIC or version != RouteTable.FILE_VERSION or \
+                byteorder != sys.byteorder[0].encode() or typecode not in (b'q', b'd') or \
+                file_digest != digest or n != len(tracks):
+            return None
+        dist_size = 8 * n * n
+        if len(data) != header_size + dist_size + 4 * n * n:
+            return None
+        table = RouteTable.__new__(RouteTable)
+        table._index_tracks(tracks)
+        table.typecode = typecode.decode()
+        view = memoryview(data)
+        table.dist = view[header_size:header_size + dist_size].cast(table.typecode)
+        table.next = view[header_size + dist_size:].cast('i')
+        table._set_stats(start)
+        return table
+
+    def fill_row(self, tracks, i):
+        """ (re)computes routes from the i-th station """
+        n = len(self.names)
+        src = self.names[i]
+        row = i * n
+        self.dist[row:row + n] = array(self.typecode, [RouteTable.NONE]) * n
+        self.next[row:row + n] = array('i', [RouteTable.NONE]) * n
+        dist, parent, _ = dijkstra(tracks, src)
+        first = {}
+        for station, cost in dist.items():
+            j = self.index.get(station)
+            if j is None:
+                # a station without outgoing tracks
+                continue
+            self.dist[row + j] = cost
+            if station != src:
+                track = first_track(parent, first, src, station)
+                self.next[row + j] = self.edge_idx[id(track)]
+
+    def rows_improved_by(self, track):
+        """ returns rows where the track (new or cheaper) shortens some route """
+        u = self.index[track.src]
+        v = self.index.get(track.dst)
+        if v is None:
+            # no route can continue from a station without outgoing tracks
+            return []
+        n = len(self.names)
+        rows = []
+        for i in range(n):
+            to_u = self.dist[i * n + u]
+            to_v = self.dist[i * n + v]
+            if to_u != RouteTable.NONE and (to_v == RouteTable.NONE or to_u + track.cost < to_v):
+                rows.append(i)
+        return rows
+
+    def rows_using(self, track):
+        """ returns rows whose routes may go through the track """
+        u = self.index[track.src]
+        v = self.index.get(track.dst)
+        if v is None:
+            return []
+        n = len(self.names)
+        rows = []
+        for i in range(n):
+            to_u = self.dist[i * n + u]
+            if to_u != RouteTable.NONE and to_u + track.cost == self.dist[i * n + v]:
+                rows.append(i)
+        return rows
+
+    def add_edge(self, track):
+        """ registers a new track for the next-hop matrix """
+        self.edge_idx[id(track)] = len(self.edges)
+        self.edges.append(track)
+
+    def remove_edge(self, track):
+        """ unregisters a track from the next-hop matrix """
+        self.edges[self.edge_idx.pop(id(track))] = None
+
+    def replace_edge(self, old, new):
+        """ replaces a track in place, so that next hops stay valid """
+        idx = self.edge_idx.pop(id(old))
+        self.edges[idx] = new
+        self.edge_idx[id(new)] = idx
+
+    def accepts(self, track):
+        """ returns True if the track fits to the table without rebuilding it """
+        return track.src in self.index and \
+            (self.typecode == 'd' or isinstance(track.cost, int))
+
+    def get_path(self, src, dst):
+        """ follows next hops from src to dst; [] if invalid or unreachable """
+        i = self.index.get(src)
+        j = self.index.get(dst)
+        if i is None or j is None:
+            return []
+        n = len(self.names)
+        path = []
+        while i != j:
+            hop = self.next[i * n + j]
+            if hop == RouteTable.NONE:
+                return []
+            track = self.edges[hop]
+            path.append(track)
+            i = self.index[track.dst]
+        return path
+
+    def costs_from(self, src):
+        """ returns map station -> Route(cost, first track) of a single row """
+        i = self.index.get(src)
+        if i is None:
+            return {}
+        n = len(self.names)
+        row = i * n
+        routes = {}
+        for j in range(n):
+            cost = self.dist[row + j]
+            if cost != RouteTable.NONE:
+                track = self.edges[self.next[row + j]] if j != i else None
+                routes[self.names[j]] = Route(cost, track)
+        return routes
+
+    def get_cost(self, src, dst):
+        """ returns cost of the shortest path, or None """
+        i = self.index.get(src)
+        j = self.index.get(dst)
+        if i is None or j is None:
+            return None
+        cost = self.dist[i * len(self.names) + j]
+        return None if cost == RouteTable.NONE else cost
+
+
+CacheStats = namedtuple('CacheStats', ['size', 'capacity', 'hits', 'misses', 'evictions'])
+
+
+class PathCache:
+    """ bounded LRU cache of paths: (src, dst) -> tuple of tracks """
+
+    def __init__(self, capacity):
+        assert capacity > 0
+        self.capacity = capacity
+        self.paths = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, src, dst):
+        """ returns cached path (tuple), or None if not cached """
+        path = self.paths.get((src, dst))
+        if path is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.paths.move_to_end((src, dst))
+        return path
+
+    def put(self, src, dst, path):
+        """ stores the path, evicts the least recently used one if full """
+        self.paths[(src, dst)] = tuple(path)
+        self.paths.move_to_end((src, dst))
+        if len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """ invalidates all the cached paths """
+        self.paths.clear()
+
+    def discard(self, predicate):
+        """ invalidates cached paths for which predicate(src, dst, path) holds """
+        for key in [key for key, path in self.paths.items() if predicate(key[0], key[1], path)]:
+            del self.paths[key]
+
+    def stats(self):
+        """ returns CacheStats """
+        return CacheStats(len(self.paths), self.capacity, self.hits, self.misses, self.evictions)
 
 
 class Tracks:
     """ mapped tracks """
 
-    def __init__(self, tracks):
+    # maximal number of stations to precompute all the routes automatically
+    PRECOMPUTE_LIMIT = 500
+    # default capacity of the path cache used without the route table
+    CACHE_SIZE = 1024
+    # default number of landmarks of the ALT search
+    LANDMARKS = 4
+
+    def __init__(self, tracks, precompute=None, cache_size=None, search='dijkstra', landmarks=None,
+                 table_file=None):
+        """
+        Precompute is True to build the route table, False to search on demand
+        or None to decide according to the number of stations. The route table
+        is mapped from table_file if it was saved there for the same tracks,
+        otherwise it is built and saved there.
+        Searched paths are cached in LRU cache of cache_size paths
+        (Tracks.CACHE_SIZE by default, 0 disables the cache).
+        Search on demand is either 'dijkstra' or 'alt' - A* with lower bounds
+        given by landmarks (Tracks.LANDMARKS by default).
+        """
         # create track map: src -> (src, dst, delay)
         self.tracks = {}
         for track in tracks:
@@ -83,13 +647,264 @@ class Tracks:
                 self.tracks[track.src].append(track)
             else:
                 self.tracks[track.src] = [track]
+        self._init_routes(precompute, cache_size, search, landmarks, table_file)
+
+    @classmethod
+    def from_file(cls, filename, fmt=None, **kwargs):
+        """ creates tracks streamed from a file, see read_tracks() """
+        return cls(read_tracks(filename, fmt), **kwargs)
+
+    def to_file(self, filename, fmt=None):
+        """ streams all the tracks to a file, see write_tracks() """
+        write_tracks(self.all_tracks(), filename, fmt)
+
+    def _init_routes(self, precompute, cache_size, search, landmarks, table_file):
+        """ sets up the connectivity index, the route table or the path cache """
+        self.table_file = table_file
+        if search not in ('dijkstra', 'alt'):
+            raise ValueError("unknown search: %s" % search)
+        self.nlandmarks = (Tracks.LANDMARKS if landmarks is None else landmarks) if search == 'alt' else 0
+        self.landmarks = self._select_landmarks()
+        # number of stations expanded by point to point searches
+        self.expanded = 0
+        self.reachability = Reachability(self.stations(), self.successors)
+        if precompute is None:
+            precompute = len(self.stations()) <= Tracks.PRECOMPUTE_LIMIT
+        self.table = self._build_table(True) if precompute else None
+        if cache_size is None:
+            cache_size = Tracks.CACHE_SIZE
+        self.cache = PathCache(cache_size) if cache_size and self.table is None else None
+
+    def track_map(self):
+        """ returns map station -> list of its outgoing tracks """
+        return self.tracks
+
+    def digest(self):
+        """ returns SHA-256 digest of all the tracks in their order """
+        sha = hashlib.sha256()
+        for track in self.all_tracks():
+            sha.update(repr(tuple(track)).encode())
+        return sha.digest()
+
+    def _build_table(self, from_file=False):
+        """
+        builds the route table; from_file (at construction) maps it from the
+        table file or saves it there, so the file keeps the table of the
+        original tracks and tables rebuilt after mutations are not saved
+        """
+        if not from_file or self.table_file is None:
+            return RouteTable(self.track_map())
+        digest = self.digest()
+        track_map = self.track_map()
+        table = RouteTable.load(track_map, self.table_file, digest)
+        if table is None:
+            # missing or stale file
+            table = RouteTable(track_map)
+            table.save(self.table_file, digest)
+        return table
+
+    def all_tracks(self):
+        """ iterates over all the tracks """
+        for tracks in self.tracks.values():
+            yield from tracks
+
+    def successors(self, station):
+        """ iterates over stations reachable from the station by a single track """
+        for track in self.tracks.get(station, ()):
+            if track.dst in self.tracks:
+                yield track.dst
+
+    def reachable(self, src, dst):
+        """ returns True if dst can be reached from src, by a bit set lookup (see Reachability) """
+        return self.reachability.reachable(src, dst)
+
+    def invalidate(self):
+        """
+        Drops all the precomputed and cached routes. Must be called after
+        the track map has been changed.
+        """
+        self.reachability = Reachability(self.stations(), self.successors)
+        self.landmarks = self._select_landmarks()
+        if self.table is not None:
+            self.table = self._build_table()
+        if self.cache is not None:
+            self.cache.clear()
+
+    def _select_landmarks(self):
+        """ returns Landmarks for the ALT search, or None """
+        if not self.nlandmarks:
+            return None
+        reverse = {}
+        for track in self.all_tracks():
+            reverse.setdefault(track.dst, []).append(Track(track.dst, track.src, track.cost))
+        return Landmarks(self.stations(), lambda station: dijkstra(self.tracks, station)[0],
+                         lambda station: dijkstra(reverse, station)[0], self.nlandmarks)
+
+    def _heuristic(self, dst):
+        """ returns lower bound function for A* search to dst, or None """
+        return self.landmarks.heuristic(dst) if self.landmarks is not None else None
+
+    def add_track(self, track):
+        """ adds a new track, repairs only the affected routes """
+        new_station = track.src not in self.tracks
+        # a track between already connected stations keeps the components
+        connected = self.reachable(track.src, track.dst)
+        self.tracks.setdefault(track.src, []).append(track)
+        if not connected:
+            self.reachability = Reachability(self.stations(), self.successors)
+        # lower bounds are no longer valid for a new path
+        self.landmarks = self._select_landmarks()
+        if self.table is not None:
+            if new_station or not self.table.accepts(track):
+                self.table = self._build_table()
+            else:
+                self.table.add_edge(track)
+                self._repair(self.table.rows_improved_by(track))
+        if self.cache is not None:
+            self._discard_improved(track)
+
+    def remove_track(self, src, dst):
+        """
+        Removes the track src -> dst, repairs only the affected routes.
+        Returns the removed track. The station src is kept, even without
+        any other outgoing track.
+        """
+        track = self._find_track(src, dst)
+        rows = self.table.rows_using(track) if self.table is not None else []
+        self.tracks[src].remove(track)
+        self.reachability = Reachability(self.stations(), self.successors)
+        if self.table is not None:
+            self.table.remove_edge(track)
+            self._repair(rows)
+        if self.cache is not None:
+            self._discard_using(track)
+        return track
+
+    def set_cost(self, src, dst, cost):
+        """
+        Changes cost of the track src -> dst, repairs only the affected
+        routes. Returns the original track.
+        """
+        old = self._find_track(src, dst)
+        if cost == old.cost:
+            return old
+        new = old._replace(cost=cost)
+        if self.table is not None:
+            if cost < old.cost:
+                rows = self.table.rows_improved_by(new)
+            else:
+                rows = self.table.rows_using(old)
+        track_list = self.tracks[src]
+        track_list[track_list.index(old)] = new
+        if cost < old.cost:
+            self.landmarks = self._select_landmarks()
+        if self.table is not None:
+            if not self.table.accepts(new):
+                self.table = self._build_table()
+            else:
+                self.table.replace_edge(old, new)
+                self._repair(rows)
+        if self.cache is not None:
+            self._discard_using(old)
+            if cost < old.cost:
+                self._discard_improved(new)
+        return old
+
+    def _find_track(self, src, dst):
+        """ returns the track src -> dst or raises ValueError """
+        for track in self.tracks.get(src, ()):
+            if track.dst == dst:
+                return track
+        raise ValueError("no track %s -> %s" % (src, dst))
+
+    def _repair(self, rows):
+        """ recomputes the given rows of the route table """
+        for i in rows:
+            self.table.fill_row(self.tracks, i)
+
+    def _discard_using(self, track):
+        """ drops cached paths going through the track """
+        self.cache.discard(lambda src, dst, path: any(
+            t.src == track.src and t.dst == track.dst for t in path))
+
+    def _discard_improved(self, track):
+        """ drops cached paths which may be shortened by the track """
+        # any path through the track costs at least track.cost
+        self.cache.discard(lambda src, dst, path: src != dst and (
+            not path or sum(t.cost for t in path) > track.cost))
 
     def get_path(self, src, dst):
         """
-        Find shortest path from src to dst. Returns [] if invalid locations.
-        Not connected subgraphs may cause infinite cycle.
+        Find shortest path from src to dst. Returns [] if invalid locations
+        or if dst is not reachable from src.
+        """
+        if not self.reachable(src, dst):
+            return []
+        if self.table is not None:
+            return self.table.get_path(src, dst)
+        if self.cache is None:
+            return self._search_path(src, dst)
+        path = self.cache.get(src, dst)
+        if path is None:
+            path = self._search_path(src, dst)
+            self.cache.put(src, dst, path)
+            return path
+        return list(path)
+
+    def get_cost(self, src, dst):
+        """
+        Cost of the shortest path from src to dst. Returns None if invalid
+        locations or if dst is not reachable from src.
         """
-        return ucs(self.tracks, src, dst)
+        if not self.reachable(src, dst):
+            return None
+        if self.table is not None:
+            return self.table.get_cost(src, dst)
+        if src == dst:
+            return 0
+        if self.cache is not None:
+            path = self.get_path(src, dst)
+            return sum(track.cost for track in path) if path else None
+        return self._search_cost(src, dst)
+
+    def costs_from(self, src):
+        """
+        Shortest routes from src to all the reachable stations by a single
+        search. Returns map station -> Route(cost, first track of the path),
+        where the track is None for src itself. Returns {} if invalid src.
+        """
+        if self.table is not None:
+            return self.table.costs_from(src)
+        if src not in self.stations():
+            return {}
+        return self._search_routes(src)
+
+    def _search_path(self, src, dst):
+        """ on demand search of the shortest path between valid stations """
+        _, parent, closed = dijkstra(self.tracks, src, dst, self._heuristic(dst))
+        self.expanded += len(closed)
+        return build_path(parent, src, dst) if dst in parent else []
+
+    def _search_cost(self, src, dst):
+        """ on demand search of the shortest path cost between valid stations """
+        dist, parent, closed = dijkstra(self.tracks, src, dst, self._heuristic(dst))
+        self.expanded += len(closed)
+        return dist[dst] if dst in parent else None
+
+    def _search_routes(self, src):
+        """ on demand search of routes from a valid station """
+        dist, parent, _ = dijkstra(self.tracks, src)
+        first = {}
+        return {station: Route(cost, first_track(parent, first, src, station) if station != src else None)
+                for station, cost in dist.items() if station in self.tracks}
+
+    def table_stats(self):
+        """ returns TableStats of the precomputed routes, or None """
+        return self.table.stats if self.table is not None else None
+
+    def cache_stats(self):
+        """ returns CacheStats of the path cache, or None """
+        return self.cache.stats() if self.cache is not None else None
 
     def stations(self):
         """ Return set of stations. Read only. """
@@ -99,8 +914,204 @@ class Tracks:
         """ Exports map of tracks to Graphviz """
         with open(filename, "w") as output:
             output.write("digraph track {\n")
-            for tracks in self.tracks.values():
-                for track in tracks:
-                    output.write('  %s -> %s [label="%s"];\n' %
-                                 (track.src, track.dst, track.cost))
+            output.writelines('  %s -> %s [label="%s"];\n' % (track.src, track.dst, track.cost)
+                              for track in self.all_tracks())
             output.write('}\n')
+
+
+class CsrTracks(Tracks):
+    """
+    Compact tracks for large factories. Stations are numbered once, and the
+    outgoing tracks of the i-th station are stored as compressed sparse rows:
+    targets[offsets[i]:offsets[i + 1]] with the respective costs. Paths are
+    searched over the arrays, tracks are created only for the results.
+    """
+
+    def __init__(self, tracks, precompute=None, cache_size=None, search='dijkstra', landmarks=None,
+                 table_file=None):
+        self._build(tracks)
+        self._init_routes(precompute, cache_size, search, landmarks, table_file)
+
+    def _build(self, tracks, stations=()):
+        """
+        Builds the arrays from an iterable of tracks in a single pass.
+        The given stations are numbered first, even without any track.
+        """
+        # all the names, including the ones without outgoing tracks
+        self.names = list(stations)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        # stations in the order of appearance
+        self.station_ids = dict(self.index)
+        srcs = array('l')
+        dsts = array('l')
+        costs = array('q')
+        for track in tracks:
+            ids = []
+            for name in (track.src, track.dst):
+                i = self.index.get(name)
+                if i is None:
+                    i = self.index[name] = len(self.names)
+                    self.names.append(name)
+                ids.append(i)
+            if track.src not in self.station_ids:
+                self.station_ids[track.src] = ids[0]
+            srcs.append(ids[0])
+            dsts.append(ids[1])
+            if costs.typecode == 'q' and not isinstance(track.cost, int):
+                costs = array('d', costs)
+            costs.append(track.cost)
+
+        self.offsets, self.targets, self.costs = csr_build(len(self.names), srcs, dsts, costs)
+
+    def _rebuild(self, tracks):
+        """ rebuilds the arrays keeping all the stations, drops all the routes """
+        self._build(tracks, list(self.station_ids))
+        self.invalidate()
+
+    def add_track(self, track):
+        """ adds a new track, the arrays and the routes are rebuilt """
+        self._rebuild(list(self.all_tracks()) + [track])
+
+    def remove_track(self, src, dst):
+        """
+        Removes the track src -> dst, the arrays and the routes are rebuilt.
+        Returns the removed track.
+        """
+        tracks = list(self.all_tracks())
+        track = self._find_track(src, dst)
+        tracks.remove(track)
+        self._rebuild(tracks)
+        return track
+
+    def set_cost(self, src, dst, cost):
+        """
+        Changes cost of the track src -> dst, the arrays and the routes are
+        rebuilt. Returns the original track.
+        """
+        tracks = list(self.all_tracks())
+        old = self._find_track(src, dst)
+        tracks[tracks.index(old)] = old._replace(cost=cost)
+        self._rebuild(tracks)
+        return old
+
+    def _find_track(self, src, dst):
+        """ returns the track src -> dst or raises ValueError """
+        i = self.station_ids.get(src)
+        j = self.index.get(dst)
+        if i is not None and j is not None:
+            for edge in range(self.offsets[i], self.offsets[i + 1]):
+                if self.targets[edge] == j:
+                    return self._track(edge)
+        raise ValueError("no track %s -> %s" % (src, dst))
+
+    def memory(self):
+        """ returns approximate size of the arrays in bytes """
+        return sum(arr.itemsize * len(arr) for arr in (self.offsets, self.targets, self.costs))
+
+    def _edge_source(self, edge):
+        """ returns station number the edge starts at """
+        return bisect.bisect_right(self.offsets, edge) - 1
+
+    def _track(self, edge):
+        """ creates the track of the given edge number """
+        return Track(self.names[self._edge_source(edge)], self.names[self.targets[edge]], self.costs[edge])
+
+    def track_map(self):
+        """ returns map station -> list of its outgoing tracks, built on the fly """
+        return {name: [self._track(edge) for edge in range(self.offsets[i], self.offsets[i + 1])]
+                for name, i in self.station_ids.items()}
+
+    @property
+    def tracks(self):
+        """
+        map station -> list of its outgoing tracks as Tracks.tracks, built on
+        the fly; changes of it are lost, use add_track() and the others
+        """
+        return self.track_map()
+
+    def all_tracks(self):
+        """ iterates over all the tracks """
+        for name, i in self.station_ids.items():
+            for edge in range(self.offsets[i], self.offsets[i + 1]):
+                yield Track(name, self.names[self.targets[edge]], self.costs[edge])
+
+    def stations(self):
+        """ Return set of stations. Read only. """
+        return self.station_ids.keys()
+
+    def successors(self, station):
+        """ iterates over stations reachable from the station by a single track """
+        i = self.station_ids[station]
+        for edge in range(self.offsets[i], self.offsets[i + 1]):
+            name = self.names[self.targets[edge]]
+            if name in self.station_ids:
+                yield name
+
+    def _select_landmarks(self):
+        """ returns Landmarks over station numbers for the ALT search, or None """
+        if not self.nlandmarks:
+            return None
+        sources = array('l')
+        for i in range(len(self.names)):
+            sources.extend([i] * (self.offsets[i + 1] - self.offsets[i]))
+        reverse = csr_build(len(self.names), self.targets, sources, self.costs)
+
+        def costs(graph, station):
+            dist = csr_dijkstra(*graph, station)[0]
+            return {j: cost for j, cost in enumerate(dist) if cost is not None}
+
+        return Landmarks(self.station_ids.values(),
+                         lambda station: costs((self.offsets, self.targets, self.costs), station),
+                         lambda station: costs(reverse, station), self.nlandmarks)
+
+    def _search(self, i, j=-1, heuristic=None):
+        """ searches over the arrays of this instance """
+        return csr_dijkstra(self.offsets, self.targets, self.costs, i, j, heuristic)
+
+    def _search_path(self, src, dst):
+        """ on demand search of the shortest path between valid stations """
+        i, j = self.station_ids[src], self.station_ids[dst]
+        _, parent, closed = self._search(i, j, self._heuristic(j))
+        self.expanded += closed.count(1)
+        if parent[j] == -1:
+            return []
+        path = []
+        while j != i:
+            edge = parent[j]
+            path.append(self._track(edge))
+            j = self._edge_source(edge)
+        path.reverse()
+        return path
+
+    def _search_cost(self, src, dst):
+        """ on demand search of the shortest path cost between valid stations """
+        j = self.station_ids[dst]
+        dist, _, closed = self._search(self.station_ids[src], j, self._heuristic(j))
+        self.expanded += closed.count(1)
+        return dist[j]
+
+    def _search_routes(self, src):
+        """ on demand search of routes from a valid station """
+        i = self.station_ids[src]
+        dist, parent, _ = self._search(i)
+        # first edge of the path to each station, memoized
+        first = array('l', [-1]) * len(self.names)
+        routes = {}
+        for name, j in self.station_ids.items():
+            if dist[j] is None:
+                continue
+            if j != i:
+                chain = []
+                k = j
+                while first[k] == -1:
+                    edge = parent[k]
+                    prev = self._edge_source(edge)
+                    if prev == i:
+                        first[k] = edge
+                        break
+                    chain.append(k)
+                    k = prev
+                for station in chain:
+                    first[station] = first[k]
+            routes[name] = Route(dist[j], self._track(first[j]) if j != i else None)
+        return routes
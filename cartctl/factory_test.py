@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Factory tracks and path finding testing.
+
+import os
+import random
+import tempfile
+import unittest
+
+from factory import CsrTracks, Track, Tracks, strong_components
+from layouts import grid_layout
+from jarvisenv import Jarvis
+
+
+class TestTracks(unittest.TestCase):
+    """ A test suite for the factory tracks and the path finder. """
+
+    # shortest paths on the Jarvis layout as (src, dst) -> visited stations
+    JARVIS_PATHS = {
+        ('A', 'B'): 'AB', ('A', 'C'): 'ABC', ('A', 'D'): 'ABCD',
+        ('B', 'A'): 'BA', ('B', 'C'): 'BC', ('B', 'D'): 'BCD',
+        ('C', 'A'): 'CDA', ('C', 'B'): 'CDAB', ('C', 'D'): 'CD',
+        ('D', 'A'): 'DA', ('D', 'B'): 'DAB', ('D', 'C'): 'DABC',
+    }
+
+    @staticmethod
+    def stations_of(path: list) -> str:
+        """ Converts a path to a string of visited stations. """
+        return path[0].src + ''.join(track.dst for track in path) if path else ''
+
+    @staticmethod
+    def jarvis_layout() -> list:
+        """ Returns list of all the Jarvis tracks. """
+        return list(Jarvis.LAYOUT)
+
+    def test_jarvis_paths(self) -> None:
+        """ Paths on the Jarvis layout are the same as before. """
+        for precompute in (True, False):
+            tracks = Tracks(self.jarvis_layout(), precompute)
+            for (src, dst), expected in self.JARVIS_PATHS.items():
+                self.assertEqual(expected, self.stations_of(tracks.get_path(src, dst)))
+            for station in 'ABCD':
+                self.assertEqual([], tracks.get_path(station, station))
+
+    def test_invalid_stations(self) -> None:
+        """ Unknown stations give an empty path. """
+        tracks = Jarvis.get_tracks()
+        self.assertEqual([], tracks.get_path('A', 'X'))
+        self.assertEqual([], tracks.get_path('X', 'A'))
+
+    def test_unreachable(self) -> None:
+        """ Not connected subgraphs terminate with an empty path. """
+        tracks = Tracks([
+            Track('A', 'B', 1), Track('B', 'A', 1),
+            Track('C', 'D', 1), Track('D', 'C', 1),
+            Track('D', 'A', 1),
+        ])
+        self.assertEqual([], tracks.get_path('A', 'C'))
+        self.assertEqual('CDAB', self.stations_of(tracks.get_path('C', 'B')))
+
+    def test_cheaper_longer_path(self) -> None:
+        """ The cheapest path wins over the shortest one. """
+        tracks = Tracks([
+            Track('A', 'D', 10),
+            Track('A', 'B', 1), Track('B', 'C', 1), Track('C', 'D', 1),
+            Track('D', 'A', 1),
+        ])
+        self.assertEqual('ABCD', self.stations_of(tracks.get_path('A', 'D')))
+
+    def test_route_table(self) -> None:
+        """ Precomputed routes give the same costs as the search on demand. """
+        layout = list(grid_layout(64, seed=1))
+        table = Tracks(layout, precompute=True)
+        search = Tracks(layout, precompute=False)
+        self.assertIsNotNone(table.table_stats())
+        self.assertIsNone(search.table_stats())
+        self.assertEqual(64, table.table_stats().stations)
+        for src in search.stations():
+            for dst in search.stations():
+                cost = search.get_cost(src, dst)
+                self.assertEqual(cost, table.get_cost(src, dst))
+                self.assertEqual(cost, sum(track.cost for track in table.get_path(src, dst)))
+
+    def test_get_cost(self) -> None:
+        """ Costs of the shortest paths on the Jarvis layout. """
+        for precompute in (True, False):
+            tracks = Tracks(self.jarvis_layout(), precompute)
+            self.assertEqual(60, tracks.get_cost('A', 'D'))
+            self.assertEqual(30, tracks.get_cost('C', 'A'))
+            self.assertEqual(0, tracks.get_cost('B', 'B'))
+            self.assertIsNone(tracks.get_cost('A', 'X'))
+
+    def test_path_cache(self) -> None:
+        """ Searched paths are cached with LRU eviction. """
+        tracks = Tracks(self.jarvis_layout(), precompute=False, cache_size=2)
+        self.assertEqual('ABC', self.stations_of(tracks.get_path('A', 'C')))
+        self.assertEqual('ABC', self.stations_of(tracks.get_path('A', 'C')))
+        self.assertEqual((1, 2, 1, 1, 0), tuple(tracks.cache_stats()))
+        tracks.get_path('C', 'A')
+        tracks.get_path('A', 'C')
+        # evicts C -> A, being the least recently used one
+        tracks.get_path('D', 'B')
+        self.assertEqual((2, 2, 2, 3, 1), tuple(tracks.cache_stats()))
+        tracks.get_path('A', 'C')
+        self.assertEqual(3, tracks.cache_stats().hits)
+        tracks.get_path('C', 'A')
+        self.assertEqual(4, tracks.cache_stats().misses)
+        self.assertEqual(30, tracks.get_cost('C', 'A'))
+        self.assertIsNone(Tracks(self.jarvis_layout(), precompute=True).cache_stats())
+
+    def test_invalidate(self) -> None:
+        """ Changed track map is reflected after invalidation. """
+        for precompute in (True, False):
+            tracks = Tracks(self.jarvis_layout(), precompute)
+            self.assertEqual('CDA', self.stations_of(tracks.get_path('C', 'A')))
+            tracks.tracks['C'].append(Track('C', 'A', 5))
+            tracks.invalidate()
+            self.assertEqual('CA', self.stations_of(tracks.get_path('C', 'A')))
+            self.assertEqual(25, tracks.get_cost('C', 'B'))
+
+    def test_mutations(self) -> None:
+        """ Repaired routes match routes of freshly built tracks. """
+        rnd = random.Random(2)
+        for precompute in (True, False):
+            tracks = Tracks(grid_layout(36, seed=3), precompute)
+            stations = sorted(tracks.stations())
+            for _ in range(60):
+                # warm up the routes
+                for src in rnd.sample(stations, 4):
+                    for dst in rnd.sample(stations, 4):
+                        tracks.get_path(src, dst)
+                track = rnd.choice([t for ts in tracks.tracks.values() for t in ts])
+                operation = rnd.randrange(4)
+                if operation == 0:
+                    tracks.remove_track(track.src, track.dst)
+                elif operation == 1:
+                    tracks.add_track(Track(rnd.choice(stations), rnd.choice(stations), rnd.randint(1, 40)))
+                else:
+                    tracks.set_cost(track.src, track.dst, rnd.randint(1, 40))
+                fresh = Tracks([t for ts in tracks.tracks.values() for t in ts], precompute=False, cache_size=0)
+                for src in stations:
+                    for dst in rnd.sample(stations, 6):
+                        cost = fresh.get_cost(src, dst)
+                        self.assertEqual(cost, tracks.get_cost(src, dst))
+                        path = tracks.get_path(src, dst)
+                        self.assertEqual(cost or 0, sum(t.cost for t in path))
+                        for t in path:
+                            self.assertIn(t, tracks.tracks[t.src])
+
+    def test_mutation_new_station(self) -> None:
+        """ A track from a new station rebuilds the routes. """
+        for precompute in (True, False):
+            tracks = Tracks(self.jarvis_layout(), precompute)
+            self.assertEqual([], tracks.get_path('E', 'A'))
+            tracks.add_track(Track('E', 'A', 1))
+            tracks.add_track(Track('A', 'E', 1))
+            self.assertEqual('EAB', self.stations_of(tracks.get_path('E', 'B')))
+            self.assertEqual('DAE', self.stations_of(tracks.get_path('D', 'E')))
+            self.assertEqual(Track('A', 'E', 1), tracks.remove_track('A', 'E'))
+            self.assertEqual([], tracks.get_path('D', 'E'))
+            self.assertRaises(ValueError, tracks.remove_track, 'A', 'E')
+
+    def test_costs_from(self) -> None:
+        """ Single source routes agree with the point to point ones. """
+        layout = list(grid_layout(49, seed=4))
+        for precompute in (True, False):
+            tracks = Tracks(layout, precompute)
+            for src in tracks.stations():
+                routes = tracks.costs_from(src)
+                self.assertEqual((0, None), tuple(routes[src]))
+                for dst in tracks.stations():
+                    if dst != src:
+                        self.assertEqual(tracks.get_cost(src, dst), routes[dst].cost)
+                        self.assertEqual(tracks.get_path(src, dst)[0], routes[dst].track)
+        self.assertEqual({}, Tracks(layout).costs_from('X'))
+
+    def test_csr_tracks(self) -> None:
+        """ The compact backend behaves as the track map. """
+        layout = list(grid_layout(49, seed=5)) + [Track('S0_0', 'sink', 1)]
+        for precompute in (True, False):
+            tracks = Tracks(layout, precompute=False, cache_size=0)
+            csr = CsrTracks(layout, precompute)
+            self.assertEqual(list(tracks.stations()), list(csr.stations()))
+            self.assertEqual(list(tracks.all_tracks()), list(csr.all_tracks()))
+            self.assertEqual(tracks.tracks, csr.tracks)
+            for src in tracks.stations():
+                self.assertEqual(tracks.costs_from(src), csr.costs_from(src))
+                for dst in tracks.stations():
+                    self.assertEqual(tracks.get_path(src, dst), csr.get_path(src, dst))
+                    self.assertEqual(tracks.get_cost(src, dst), csr.get_cost(src, dst))
+            self.assertEqual([], csr.get_path('S0_0', 'sink'))
+
+    def test_csr_mutations(self) -> None:
+        """ The compact backend rebuilds itself on mutations. """
+        for precompute in (True, False):
+            tracks = CsrTracks(self.jarvis_layout(), precompute)
+            tracks.set_cost('C', 'D', 100)
+            self.assertEqual('CDA', self.stations_of(tracks.get_path('C', 'A')))
+            self.assertEqual(110, tracks.get_cost('C', 'A'))
+            tracks.add_track(Track('C', 'A', 5))
+            self.assertEqual('CA', self.stations_of(tracks.get_path('C', 'A')))
+            self.assertEqual(Track('C', 'D', 100), tracks.remove_track('C', 'D'))
+            self.assertEqual(Track('C', 'A', 5), tracks.remove_track('C', 'A'))
+            self.assertEqual(list('ABCD'), list(tracks.stations()))
+            self.assertEqual([], tracks.get_path('C', 'A'))
+            self.assertRaises(ValueError, tracks.remove_track, 'C', 'A')
+
+    def test_strong_components(self) -> None:
+        """ Components are numbered in reverse topological order. """
+        graph = {'A': 'B', 'B': 'AC', 'C': 'D', 'D': 'C', 'E': 'A'}
+        component, count = strong_components(graph, lambda station: graph[station])
+        self.assertEqual(3, count)
+        self.assertEqual(component['A'], component['B'])
+        self.assertEqual(component['C'], component['D'])
+        self.assertLess(component['C'], component['A'])
+        self.assertLess(component['A'], component['E'])
+
+    def test_reachable(self) -> None:
+        """ Reachability follows components and their mutations. """
+        layout = [
+            Track('A', 'B', 1), Track('B', 'A', 1), Track('B', 'C', 1),
+            Track('C', 'D', 1), Track('D', 'C', 1), Track('E', 'A', 1),
+        ]
+        for backend in (Tracks, CsrTracks):
+            for precompute in (True, False):
+                tracks = backend(layout, precompute)
+                self.assertTrue(tracks.reachable('E', 'D'))
+                self.assertTrue(tracks.reachable('C', 'C'))
+                self.assertFalse(tracks.reachable('C', 'A'))
+                self.assertFalse(tracks.reachable('A', 'E'))
+                self.assertFalse(tracks.reachable('A', 'X'))
+                self.assertEqual([], tracks.get_path('D', 'B'))
+                self.assertIsNone(tracks.get_cost('D', 'B'))
+                tracks.add_track(Track('D', 'E', 1))
+                self.assertTrue(tracks.reachable('C', 'A'))
+                self.assertEqual('DEAB', self.stations_of(tracks.get_path('D', 'B')))
+                tracks.remove_track('B', 'C')
+                self.assertFalse(tracks.reachable('A', 'C'))
+                self.assertEqual([], tracks.get_path('A', 'C'))
+
+    def test_alt_search(self) -> None:
+        """ A* with landmarks finds optimal paths expanding fewer stations. """
+        layout = list(grid_layout(400, seed=6))
+        rnd = random.Random(6)
+        for backend in (Tracks, CsrTracks):
+            plain = backend(layout, precompute=False, cache_size=0)
+            alt = backend(layout, precompute=False, cache_size=0, search='alt')
+            stations = sorted(plain.stations())
+            for _ in range(3):
+                for _ in range(20):
+                    src, dst = rnd.choice(stations), rnd.choice(stations)
+                    path = alt.get_path(src, dst)
+                    self.assertEqual(plain.get_cost(src, dst), sum(track.cost for track in path))
+                    self.assertEqual(plain.get_cost(src, dst), alt.get_cost(src, dst))
+                self.assertLess(alt.expanded, plain.expanded)
+                track = rnd.choice(list(plain.all_tracks()))
+                cost = rnd.randint(1, 40)
+                plain.set_cost(track.src, track.dst, cost)
+                alt.set_cost(track.src, track.dst, cost)
+        self.assertRaises(ValueError, Tracks, layout, search='bfs')
+
+    def test_table_file(self) -> None:
+        """ Saved route tables are mapped, stale ones are rebuilt. """
+        layout = list(grid_layout(36, seed=7))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'routes.bin')
+            built = Tracks(layout, precompute=True, table_file=filename)
+            self.assertTrue(os.path.exists(filename))
+            loaded = Tracks(layout, precompute=True, table_file=filename)
+            self.assertIsInstance(loaded.table.dist, memoryview)
+            for backend in (Tracks, CsrTracks):
+                tracks = backend(layout, precompute=True, table_file=filename)
+                for src in built.stations():
+                    self.assertEqual(built.costs_from(src), tracks.costs_from(src))
+                    for dst in built.stations():
+                        self.assertEqual(built.get_path(src, dst), tracks.get_path(src, dst))
+
+            # mutations of a mapped table do not change the file
+            loaded.set_cost(layout[0].src, layout[0].dst, 1)
+            self.assertEqual(1, loaded.get_cost(layout[0].src, layout[0].dst))
+            self.assertEqual(built.get_cost(layout[0].src, layout[0].dst),
+                             Tracks(layout, precompute=True, table_file=filename).get_cost(
+                                 layout[0].src, layout[0].dst))
+
+            # rebuilds after mutations do not overwrite the file
+            loaded.add_track(Track(layout[0].src, 'new', 1))
+            loaded.invalidate()
+            self.assertIsInstance(Tracks(layout, precompute=True, table_file=filename).table.dist, memoryview)
+
+            # stale and broken files
+            changed = [layout[0]._replace(cost=1)] + layout[1:]
+            stale = Tracks(changed, precompute=True, table_file=filename)
+            self.assertNotIsInstance(stale.table.dist, memoryview)
+            self.assertEqual(1, stale.get_cost(layout[0].src, layout[0].dst))
+            with open(filename, 'r+b') as table_file:
+                table_file.truncate(100)
+            self.assertEqual(built.get_cost(layout[0].dst, layout[0].src),
+                             Tracks(layout, precompute=True, table_file=filename).get_cost(
+                                 layout[0].dst, layout[0].src))
+            self.assertIsInstance(Tracks(layout, precompute=True, table_file=filename).table.dist, memoryview)
+
+    def test_files(self) -> None:
+        """ Tracks are streamed to and from CSV and JSONL files. """
+        layout = list(grid_layout(25, seed=8)) + [Track('S0_0', 'S1_1', 2.5)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            for fmt in ('csv', 'jsonl'):
+                filename = os.path.join(tmp_dir, 'tracks.%s' % fmt)
+                Tracks(layout).to_file(filename)
+                for backend in (Tracks, CsrTracks):
+                    tracks = backend.from_file(filename, precompute=False)
+                    self.assertEqual(list(Tracks(layout).all_tracks()), list(tracks.all_tracks()))
+                self.assertRaises(ValueError, Tracks.from_file, filename, 'xml')
+            filename = os.path.join(tmp_dir, 'tracks.txt')
+            with open(filename, 'w') as output:
+                output.write('A,B,1\n\nB,A,2.0\n')
+            self.assertEqual([Track('A', 'B', 1), Track('B', 'A', 2.0)],
+                             list(Tracks.from_file(filename, 'csv').all_tracks()))
+
+    def test_export(self) -> None:
+        """ Tracks are exported to Graphviz. """
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            filename = os.path.join(tmp_dir, 'jarvis.gv')
+            Jarvis.get_tracks().export(filename)
+            with open(filename) as exported:
+                lines = exported.read().splitlines()
+        self.assertEqual('digraph track {', lines[0])
+        self.assertEqual('  A -> B [label="20"];', lines[1])
+        self.assertEqual(7, len(lines))
+        self.assertEqual('}', lines[-1])
+
+
+if __name__ == '__main__':
+    unittest.main()
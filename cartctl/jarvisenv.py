@@ -2,25 +2,61 @@
 Jarvis factory simulation environment.
 """
 
-import sched
-
+import eventkernel
 import factory
 
 
+class JarvisEnv(factory.Factory):
+    """
+    A single simulation of the Jarvis factory with its own clock, scheduler
+    and track map, so that many of them can run in one process.
+    """
+
+    def __init__(self, tracks=None):
+        """ tracks are a fresh copy of the Jarvis tracks by default """
+        self.tracks = tracks if tracks is not None else factory.Tracks(Jarvis.LAYOUT)
+        self.kernel = eventkernel.EventKernel()
+
+    def get_tracks(self):
+        """ returns all the tracks of the simulation """
+        return self.tracks
+
+    def reset_scheduler(self):
+        """ resets scheduler for text fixture """
+        self.kernel = eventkernel.EventKernel()
+
+    def plan(self, when: int, event, argument=(), kwargs={}):
+        """ plans the event of the factory """
+        self.kernel.schedule(when, event, argument, kwargs)
+
+    def run(self, until=None):
+        """ runs the plan, or its part up to the given time """
+        self.kernel.run(until)
+
+    def step(self):
+        """ runs all the events of the next time, returns False if there is none """
+        return self.kernel.step()
+
+    def time(self):
+        """ returns absolut simulation time """
+        return self.kernel.now
+
+
 class Jarvis(factory.Factory):
-    """ Jarvis factory """
+    """ Jarvis factory, a shared simulation used through static methods """
 
-    TRACKS = factory.Tracks([
+    LAYOUT = [
         # From -> To -> Cost
         factory.Track('A', 'B', 20),
         factory.Track('B', 'A', 30),
         factory.Track('B', 'C', 20),
         factory.Track('C', 'D', 20),
         factory.Track('D', 'A', 10),
-    ])
+    ]
+
+    TRACKS = factory.Tracks(LAYOUT)
 
-    SCHED = None
-    SIMULATION_TIME = 0
+    ENV = JarvisEnv(TRACKS)
 
     @staticmethod
     def get_tracks():
@@ -30,25 +66,19 @@ class Jarvis(factory.Factory):
     @staticmethod
     def reset_scheduler():
         """ resets scheduler for text fixture """
-        Jarvis.SIMULATION_TIME = 0
-        Jarvis.SCHED = sched.scheduler(Jarvis.time, Jarvis._sleep)
+        Jarvis.ENV = JarvisEnv(Jarvis.TRACKS)
 
     @staticmethod
     def plan(when: int, event, argument=(), kwargs={}):
         """ plans the event of the factory """
-        Jarvis.SCHED.enter(when, 0, event, argument, kwargs)
+        Jarvis.ENV.plan(when, event, argument, kwargs)
 
     @staticmethod
-    def run():
-        """ runs the plan """
-        Jarvis.SCHED.run()
+    def run(until=None):
+        """ runs the plan, or its part up to the given time """
+        Jarvis.ENV.run(until)
 
     @staticmethod
     def time():
         """ returns absolut simulation time """
-        return Jarvis.SIMULATION_TIME
-
-    @staticmethod
-    def _sleep(delay):
-        """ force simulation time to progress """
-        Jarvis.SIMULATION_TIME += delay
+        return Jarvis.ENV.time()
@@ -0,0 +1,51 @@
+"""
+Machine-parseable log records of the cart and its controller.
+"""
+
+import json
+import logging
+
+# structured fields passed by the loggers of cart and cartctl
+FIELDS = ('event', 'time', 'pos', 'status', 'load', 'requests')
+
+
+class JsonFormatter(logging.Formatter):
+    """ Formats a log record as a single line JSON object with the structured fields """
+
+    def format(self, record):
+        data = {
+            'created': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in FIELDS:
+            if field in record.__dict__:
+                data[field] = record.__dict__[field]
+        return json.dumps(data, default=str)
+
+
+# loggers of the cart and the controllers
+LOGGERS = ('cart', 'cartctl', 'cartctl_fixed')
+
+
+def enable(level=logging.DEBUG, stream=None):
+    """ logs the cart and controller records at the level as JSON lines to the stream (stderr by default) """
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(JsonFormatter())
+    # levels of the loggers before, restored by disable()
+    handler.previous_levels = {}
+    for name in LOGGERS:
+        logger = logging.getLogger(name)
+        handler.previous_levels[name] = logger.level
+        logger.setLevel(level)
+        logger.addHandler(handler)
+    return handler
+
+
+def disable(handler):
+    """ removes a handler added by enable() and restores the levels of the loggers """
+    for name, level in handler.previous_levels.items():
+        logger = logging.getLogger(name)
+        logger.removeHandler(handler)
+        logger.setLevel(level)
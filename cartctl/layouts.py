@@ -0,0 +1,29 @@
+"""
+Synthetic factory layouts for the benchmarks and tests.
+"""
+
+import random
+
+from factory import Track
+
+
+def grid_layout(nstations, seed=0):
+    """
+    Generates tracks of a synthetic factory: a square grid of stations with
+    tracks in both directions and random costs.
+    """
+    rnd = random.Random(seed)
+    width = max(2, int(nstations ** 0.5))
+    height = max(2, nstations // width)
+
+    def name(x, y):
+        return 'S%d_%d' % (x, y)
+
+    for y in range(height):
+        for x in range(width):
+            if x + 1 < width:
+                yield Track(name(x, y), name(x + 1, y), rnd.randint(5, 30))
+                yield Track(name(x + 1, y), name(x, y), rnd.randint(5, 30))
+            if y + 1 < height:
+                yield Track(name(x, y), name(x, y + 1), rnd.randint(5, 30))
+                yield Track(name(x, y + 1), name(x, y), rnd.randint(5, 30))
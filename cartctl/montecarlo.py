@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+
+"""
+Monte Carlo runner of randomized request workloads against the cart controller.
+The fixed controller (cartctl_fixed) is used by default, as the original one
+does not check the prioritised requests waiting too long and stalls on them.
+"""
+
+import argparse
+import importlib
+import itertools
+import multiprocessing
+import random
+import time
+from collections import namedtuple
+
+import cart
+import jarvisenv
+import workload
+
+Scenario = namedtuple('Scenario', ['seed', 'nslots', 'load_capacity', 'nrequests', 'interval', 'controller',
+                                   'idle_wakeup'], defaults=(False,))
+
+# overdue are the requests waiting too long, rejected are the ones which can never be served
+Result = namedtuple('Result', ['scenario', 'requested', 'delivered', 'latencies', 'simulation_time',
+                               'overdue', 'rejected', 'seconds'])
+
+Summary = namedtuple('Summary', ['scenarios', 'requested', 'delivered', 'throughput', 'latency_p50',
+                                 'latency_p90', 'latency_p99', 'overdue', 'rejected', 'seconds'])
+
+
+def make_scenarios(nscenarios, seed, nslots, load_capacity, nrequests=100, interval=40, controller='cartctl_fixed',
+                   idle_wakeup=False):
+    """
+    Yields scenarios with seeds derived deterministically from the given
+    seed, for each of the numbers of slots and load capacities.
+    """
+    rnd = random.Random(seed)
+    for _ in range(nscenarios):
+        scenario_seed = rnd.getrandbits(32)
+        for slots, capacity in itertools.product(nslots, load_capacity):
+            yield Scenario(scenario_seed, slots, capacity, nrequests, interval, controller, idle_wakeup)
+
+
+def run_scenario(scenario):
+    """
+    runs a single scenario in a fresh environment, returns Result; the
+    requests waiting too long are counted without stopping the simulation
+    (a controller which does not check them, as cartctl, reports none)
+    """
+    start = time.perf_counter()
+    ctl_module = importlib.import_module(scenario.controller)
+    env = jarvisenv.JarvisEnv()
+    cart_dev = cart.Cart(scenario.nslots, scenario.load_capacity)
+    cart_ctl = ctl_module.CartCtl(cart_dev, env, idle_wakeup=scenario.idle_wakeup)
+    latencies = []
+    overdue = []
+    cart_ctl.onexpire = overdue.append
+
+    def on_unload(cart_dev, cargo_req):
+        latencies.append(env.time() - cargo_req.born)
+
+    def request(cargo_req):
+        cargo_req.onunload = on_unload
+        cart_ctl.request(cargo_req)
+
+    requests = workload.Workload(env.get_tracks().stations(), scenario.seed, scenario.interval)
+    requests.feed(env, request, scenario.nrequests)
+    env.run()
+    return Result(scenario, scenario.nrequests, len(latencies), latencies, env.time(),
+                  len(overdue), cart_ctl.rejected, time.perf_counter() - start)
+
+
+def run_scenarios(scenarios, workers=None, chunksize=4):
+    """
+    Runs the scenarios in a pool of worker processes (serially if workers
+    is 1) and yields their results as soon as they are done.
+    """
+    if workers == 1:
+        yield from map(run_scenario, scenarios)
+        return
+    with multiprocessing.Pool(workers) as pool:
+        yield from pool.imap_unordered(run_scenario, scenarios, chunksize)
+
+
+def percentile(values, fraction):
+    """ returns percentile of sorted values, or None if there are none """
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def summarize(results):
+    """ aggregates results into a Summary """
+    nscenarios = requested = delivered = overdue = rejected = 0
+    simulation_time = seconds = 0
+    latencies = []
+    for result in results:
+        nscenarios += 1
+        requested += result.requested
+        delivered += result.delivered
+        latencies.extend(result.latencies)
+        simulation_time += result.simulation_time
+        overdue += result.overdue
+        rejected += result.rejected
+        seconds += result.seconds
+    latencies.sort()
+    return Summary(nscenarios, requested, delivered,
+                   delivered / simulation_time if simulation_time else 0.0,
+                   percentile(latencies, 0.5), percentile(latencies, 0.9), percentile(latencies, 0.99),
+                   overdue, rejected, seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scenarios', type=int, default=100, help='number of random workloads')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the workloads')
+    parser.add_argument('--slots', type=int, nargs='+', default=[1, 2, 4], help='numbers of cart slots')
+    parser.add_argument('--capacity', type=int, nargs='+', default=[150], help='cart load capacities')
+    parser.add_argument('--requests', type=int, default=100, help='requests per workload')
+    parser.add_argument('--interval', type=int, default=40, help='mean time between requests')
+    parser.add_argument('--controller', default='cartctl_fixed', help='module with CartCtl')
+    parser.add_argument('--idle-wakeup', action='store_true', help='idle controller wakes up to age requests')
+    parser.add_argument('--workers', type=int, default=None, help='worker processes (all cores by default)')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    results = {}
+    scenarios = make_scenarios(args.scenarios, args.seed, args.slots, args.capacity,
+                               args.requests, args.interval, args.controller, args.idle_wakeup)
+    for result in run_scenarios(scenarios, args.workers):
+        results.setdefault((result.scenario.nslots, result.scenario.load_capacity), []).append(result)
+    for (nslots, load_capacity), config_results in sorted(results.items()):
+        summary = summarize(config_results)
+        print('slots=%d capacity=%d: %s' % (nslots, load_capacity, summary))
+    print('wall time %.3fs' % (time.perf_counter() - start))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Monte Carlo runner testing.
+
+import unittest
+
+import montecarlo
+
+
+class TestMonteCarlo(unittest.TestCase):
+    """ A test suite for the Monte Carlo runner. """
+
+    def test_deterministic(self) -> None:
+        """ Results depend only on the seeds, not on the number of workers. """
+        scenarios = list(montecarlo.make_scenarios(4, 1, [1, 2], [150], nrequests=20, interval=80))
+        self.assertEqual(8, len(scenarios))
+        self.assertEqual(scenarios, list(montecarlo.make_scenarios(4, 1, [1, 2], [150], nrequests=20, interval=80)))
+
+        def outcome(results):
+            return sorted((r.scenario, r.delivered, r.latencies, r.simulation_time, r.overdue, r.rejected)
+                          for r in results)
+
+        serial = outcome(montecarlo.run_scenarios(scenarios, workers=1))
+        parallel = outcome(montecarlo.run_scenarios(scenarios, workers=2, chunksize=1))
+        self.assertEqual(serial, parallel)
+
+    def test_overdue(self) -> None:
+        """ Requests waiting too long are counted and the whole workload is served. """
+        result = montecarlo.run_scenario(montecarlo.Scenario(1, 1, 150, 30, 10, 'cartctl_fixed'))
+        self.assertGreater(result.overdue, 1)
+        self.assertEqual((30, 30, 0), (result.delivered, len(result.latencies), result.rejected))
+
+    def test_summarize(self) -> None:
+        """ Summary aggregates deliveries, latencies and errors. """
+        scenario = montecarlo.Scenario(0, 1, 150, 3, 40, 'cartctl_fixed')
+        summary = montecarlo.summarize([
+            montecarlo.Result(scenario, 3, 2, [30, 10], 100, 0, 1, 0.5),
+            montecarlo.Result(scenario, 3, 1, [20], 100, 2, 0, 0.5),
+        ])
+        self.assertEqual((2, 6, 3, 0.015, 20, 30, 30, 2, 1, 1.0), tuple(summary))
+        self.assertIsNone(montecarlo.summarize([]).latency_p50)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,138 @@
+"""
+Queue of the waiting requests of a cart controller.
+"""
+
+import heapq
+import itertools
+
+
+def ordered(heap):
+    """ yields the requests of a heap in order without popping, skips the removed ones """
+    if not heap:
+        return
+    frontier = [(heap[0], 0)]
+    size = len(heap)
+    while frontier:
+        entry, i = heapq.heappop(frontier)
+        if entry[-1] is not None:
+            yield entry[-1]
+        for child in (2 * i + 1, 2 * i + 2):
+            if child < size:
+                heapq.heappush(frontier, (heap[child], child))
+
+
+class RequestQueue:
+    """
+    Waiting requests in buckets per priority and source station, and in
+    a tier per priority, as heaps of [-born, rank, sequence, cargo_req].
+    A request is removed by marking its entries, which are dropped when they
+    get to the top of their heap, or all at once when they outnumber the
+    waiting requests. The order is the one of the sorted list the controller
+    used to keep: normal requests, then the prioritised ones, the newest
+    first. Requests born at the same time keep the order of their arrival,
+    except that the promoted ones go before the ones prioritised at birth.
+    """
+
+    # removed entries kept in the heaps before they are compacted
+    MIN_COMPACT = 64
+
+    def __init__(self):
+        # (prio, station) -> heap of the requests from the station
+        self.buckets = {}
+        # prio -> heap of all the requests of the priority
+        self.tiers = {False: [], True: []}
+        # cargo_req -> its priority in the queue and its entries in a bucket and in a tier
+        self.entries = {}
+        self.sequence = 0
+        self.removed = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __bool__(self):
+        return bool(self.entries)
+
+    def __contains__(self, cargo_req):
+        return cargo_req in self.entries
+
+    def __iter__(self):
+        yield from ordered(self.tiers[False])
+        yield from ordered(self.tiers[True])
+
+    def __getitem__(self, index):
+        """ returns the request at the index of the order, i.e. requests[0] is the first one """
+        if index < 0:
+            index += len(self)
+            if index < 0:
+                raise IndexError('request index out of range')
+        for cargo_req in itertools.islice(self, index, None):
+            return cargo_req
+        raise IndexError('request index out of range')
+
+    def __repr__(self):
+        return 'RequestQueue(%r)' % list(self)
+
+    def add(self, cargo_req):
+        """ enqueues a new request, born prioritised or not """
+        self.push(cargo_req, 1 if cargo_req.prio else 0)
+
+    def promote(self, cargo_req):
+        """ moves a request which has just got priority to the prioritised ones """
+        self.remove(cargo_req)
+        self.push(cargo_req, 0)
+
+    def push(self, cargo_req, rank):
+        """ pushes the entries of the request of the rank among the requests born at the same time """
+        prio = bool(cargo_req.prio)
+        key = (prio, cargo_req.src)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            self.buckets[key] = bucket = []
+        bucket_entry = [-cargo_req.born, rank, self.sequence, cargo_req]
+        tier_entry = [-cargo_req.born, rank, self.sequence, cargo_req]
+        self.sequence += 1
+        heapq.heappush(bucket, bucket_entry)
+        heapq.heappush(self.tiers[prio], tier_entry)
+        self.entries[cargo_req] = (prio, bucket_entry, tier_entry)
+
+    def remove(self, cargo_req):
+        """ removes a request, raises KeyError if it is not waiting """
+        prio, bucket_entry, tier_entry = self.entries.pop(cargo_req)
+        bucket_entry[-1] = tier_entry[-1] = None
+        self.removed += 2
+        self.drop_removed(self.tiers[prio])
+        key = (prio, cargo_req.src)
+        bucket = self.buckets[key]
+        self.drop_removed(bucket)
+        if not bucket:
+            del self.buckets[key]
+        if self.removed > max(self.MIN_COMPACT, 2 * len(self.entries)):
+            self.compact()
+
+    def drop_removed(self, heap):
+        """ pops the removed entries from the top of a heap """
+        while heap and heap[0][-1] is None:
+            heapq.heappop(heap)
+            self.removed -= 1
+
+    def compact(self):
+        """ drops all the removed entries """
+        for heap in itertools.chain(self.buckets.values(), self.tiers.values()):
+            heap[:] = [entry for entry in heap if entry[-1] is not None]
+            heapq.heapify(heap)
+        self.buckets = {key: bucket for key, bucket in self.buckets.items() if bucket}
+        self.removed = 0
+
+    def first(self, prio):
+        """ returns the first request of the priority, or None """
+        tier = self.tiers[prio]
+        self.drop_removed(tier)
+        return tier[0][-1] if tier else None
+
+    def tier(self, prio):
+        """ yields the requests of the priority in order """
+        return ordered(self.tiers[prio])
+
+    def at(self, prio, station):
+        """ yields the requests of the priority from the station in order """
+        return ordered(self.buckets.get((prio, station), ()))
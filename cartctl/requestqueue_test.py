@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Queue of the waiting requests testing.
+
+import random
+import unittest
+
+from cart import CargoReq
+from requestqueue import RequestQueue
+
+
+class TestRequestQueue(unittest.TestCase):
+    """ A test suite for the queue of the waiting requests. """
+
+    @staticmethod
+    def request(src: str, born: int, content: str, prio: bool = False) -> CargoReq:
+        """ Makes a request born at the time. """
+        cargo_req = CargoReq(src, 'Z', 10, content)
+        cargo_req.born = born
+        if prio:
+            cargo_req.set_priority()
+        return cargo_req
+
+    def test_order(self) -> None:
+        """ Normal requests go first, the newest first, promoted ones before the ones prioritised at birth. """
+        queue = RequestQueue()
+        old, new, born_prio, promoted, other = (
+            self.request('A', 0, 'old'), self.request('A', 5, 'new'), self.request('B', 0, 'born_prio', True),
+            self.request('A', 0, 'promoted'), self.request('B', 5, 'other'))
+        for cargo_req in (old, new, born_prio, promoted, other):
+            queue.add(cargo_req)
+        self.assertEqual([new, other, old, promoted, born_prio], list(queue))
+        # requests born at the same time are promoted at the same time, in the order of their arrival
+        for cargo_req in (old, promoted):
+            cargo_req.set_priority()
+            queue.promote(cargo_req)
+        self.assertEqual([new, other, old, promoted, born_prio], list(queue))
+        self.assertEqual([new], list(queue.at(False, 'A')))
+        self.assertEqual([old, promoted], list(queue.at(True, 'A')))
+        self.assertEqual([old, promoted, born_prio], list(queue.tier(True)))
+        self.assertEqual((new, old, born_prio), (queue[0], queue.first(True), queue[-1]))
+        self.assertRaises(IndexError, queue.__getitem__, 5)
+        self.assertRaises(IndexError, queue.__getitem__, -6)
+
+    def test_remove(self) -> None:
+        """ Removed requests are gone from all the views of the queue. """
+        rnd = random.Random(3)
+        queue = RequestQueue()
+        waiting = []
+        for k in range(1000):
+            cargo_req = self.request(rnd.choice('ABC'), k // 7, k)
+            queue.add(cargo_req)
+            waiting.append(cargo_req)
+            if rnd.random() < 0.5:
+                cargo_req = waiting.pop(rnd.randrange(len(waiting)))
+                queue.remove(cargo_req)
+                self.assertNotIn(cargo_req, queue)
+        self.assertRaises(KeyError, queue.remove, self.request('A', 0, 'unknown'))
+        waiting.sort(key=lambda r: r.born, reverse=True)
+        self.assertEqual(len(waiting), len(queue))
+        self.assertEqual(waiting, list(queue))
+        self.assertEqual([r for r in waiting if r.src == 'B'], list(queue.at(False, 'B')))
+        self.assertLessEqual(queue.removed, max(queue.MIN_COMPACT, 2 * len(queue)))
+        for cargo_req in waiting:
+            queue.remove(cargo_req)
+        self.assertFalse(queue)
+        self.assertEqual(({}, None), (queue.buckets, queue.first(False)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+"""
+Seeded synthetic workloads of cargo requests.
+"""
+
+import bisect
+import itertools
+import random
+
+import cart
+
+
+class Workload:
+    """
+    Lazy stream of cargo requests. Bursts of requests arrive as a Poisson
+    process with the given mean interval, a burst has from 1 to burst
+    requests min_gap apart. Weights are uniform in a (low, high) pair, or
+    drawn from a dict weight -> relative frequency. Sources and destinations
+    are drawn from an od dict (src, dst) -> relative frequency, or uniformly
+    from distinct pairs of the stations. A prio_ratio of the requests is
+    prioritised from the start. The same seed gives the same stream.
+    A min_gap of at least 1 keeps requests out of a single tick, which the
+    controller would answer with two heartbeats when idle (unless it runs
+    with idle_wakeup).
+    """
+
+    def __init__(self, stations, seed=0, interval=40, burst=1, weights=(10, 50), od=None, prio_ratio=0.0,
+                 min_gap=1):
+        if interval <= 0 or burst < 1 or min_gap < 0:
+            raise ValueError('invalid arrivals: interval=%s, burst=%s, min_gap=%s' % (interval, burst, min_gap))
+        if not 0 <= prio_ratio <= 1:
+            raise ValueError('invalid priority ratio: %s' % prio_ratio)
+        self.seed = seed
+        self.interval = interval
+        self.burst = burst
+        self.min_gap = min_gap
+        self.prio_ratio = prio_ratio
+        if isinstance(weights, dict):
+            self.weights = None
+            self.weight_values, self.weight_cum = self._cumulative(weights)
+        else:
+            low, high = weights
+            if not 0 < low <= high:
+                raise ValueError('invalid weights: %s' % (weights,))
+            self.weights = (low, high)
+        if od is None:
+            stations = sorted(stations)
+            if len(stations) < 2:
+                raise ValueError('at least two stations are needed')
+            od = {(src, dst): 1 for src in stations for dst in stations if src != dst}
+        self.od_pairs, self.od_cum = self._cumulative(od)
+
+    @staticmethod
+    def _cumulative(frequencies):
+        """ returns values and cumulative frequencies for drawing them """
+        values = [value for value, frequency in frequencies.items() if frequency > 0]
+        if not values:
+            raise ValueError('no value with a positive frequency')
+        return values, list(itertools.accumulate(frequencies[value] for value in values))
+
+    @staticmethod
+    def _draw(rnd, values, cum):
+        """ draws one of the values wrt. its cumulative frequency """
+        return values[min(len(values) - 1, bisect.bisect_right(cum, rnd.random() * cum[-1]))]
+
+    def __iter__(self):
+        """ returns iterator of pairs (delay after the previous arrival, CargoReq) """
+        return Arrivals(self)
+
+    def feed(self, factory, handler, count=None):
+        """
+        Plans the arrivals into the factory one by one, each arrival plans
+        the next one before handler (e.g. CartCtl.request) gets its request,
+        so there is never more than a single pending arrival. Returns the
+        arrivals, stopped after count of them if given.
+        """
+        arrivals = Arrivals(self, count)
+        Feeder(factory, handler, arrivals).plan_next()
+        return arrivals
+
+
+class Arrivals:
+    """
+    Iterator of the arrivals of a workload. Its state is in plain attributes,
+    so it can be pickled with a checkpoint of the simulation.
+    """
+
+    def __init__(self, workload, count=None):
+        self.workload = workload
+        self.count = count
+        self.rnd = random.Random(workload.seed)
+        self.number = 0
+        # arrivals left in the current burst
+        self.burst_left = 0
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        """ returns the next pair (delay after the previous arrival, CargoReq) """
+        if self.count is not None and self.number >= self.count:
+            raise StopIteration
+        workload = self.workload
+        rnd = self.rnd
+        if self.burst_left:
+            self.burst_left -= 1
+            delay = workload.min_gap
+        else:
+            delay = max(workload.min_gap, round(rnd.expovariate(1 / workload.interval)))
+            self.burst_left = rnd.randint(1, workload.burst) - 1
+        src, dst = workload._draw(rnd, workload.od_pairs, workload.od_cum)
+        if workload.weights is not None:
+            weight = rnd.randint(*workload.weights)
+        else:
+            weight = workload._draw(rnd, workload.weight_values, workload.weight_cum)
+        cargo_req = cart.CargoReq(src, dst, weight, 'cargo%d' % self.number)
+        if rnd.random() < workload.prio_ratio:
+            cargo_req.set_priority()
+        self.number += 1
+        return delay, cargo_req
+
+
+class Feeder:
+    """ Plans the arrivals into a factory one by one, see Workload.feed """
+
+    def __init__(self, factory, handler, arrivals):
+        self.factory = factory
+        self.handler = handler
+        self.arrivals = arrivals
+
+    def plan_next(self):
+        """ plans the next arrival, if there is one """
+        for delay, cargo_req in self.arrivals:
+            self.factory.plan(delay, self.arrive, (cargo_req,))
+            return
+
+    def arrive(self, cargo_req):
+        """ an arrival, plans the next one and hands the request over """
+        self.plan_next()
+        self.handler(cargo_req)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+
+# Project: VUT FIT ATA Project - Řízení vozíku v robotické továrně
+# Author: Dominik Harmim <xharmi00@stud.fit.vutbr.cz>
+# Year: 2021
+# Description: Synthetic workload generator testing.
+
+import itertools
+import unittest
+
+from jarvisenv import JarvisEnv
+from workload import Workload
+
+
+class TestWorkload(unittest.TestCase):
+    """ A test suite for the synthetic workload generator. """
+
+    STATIONS = ['A', 'B', 'C', 'D']
+
+    @staticmethod
+    def take(workload: Workload, count: int) -> list:
+        """ Returns the first count arrivals as comparable tuples. """
+        return [(delay, r.src, r.dst, r.weight, r.content, r.prio)
+                for delay, r in itertools.islice(workload, count)]
+
+    def test_seeded(self) -> None:
+        """ The same seed gives the same stream, a different one does not. """
+        first = self.take(Workload(self.STATIONS, seed=1), 100)
+        self.assertEqual(first, self.take(Workload(self.STATIONS, seed=1), 100))
+        self.assertNotEqual(first, self.take(Workload(self.STATIONS, seed=2), 100))
+        for delay, src, dst, weight, _, prio in first:
+            self.assertGreaterEqual(delay, 1)
+            self.assertNotEqual(src, dst)
+            self.assertTrue(10 <= weight <= 50)
+            self.assertFalse(prio)
+
+    def test_distributions(self) -> None:
+        """ Weights, routes, priorities and bursts follow the parameters. """
+        workload = Workload(self.STATIONS, weights={5: 1, 20: 3}, od={('A', 'C'): 1, ('B', 'D'): 0},
+                            prio_ratio=1.0, burst=4, min_gap=2, interval=100)
+        arrivals = self.take(workload, 1000)
+        self.assertEqual({('A', 'C')}, {(src, dst) for _, src, dst, _, _, _ in arrivals})
+        self.assertEqual({5, 20}, {weight for _, _, _, weight, _, _ in arrivals})
+        self.assertTrue(all(prio for *_, prio in arrivals))
+        delays = [delay for delay, *_ in arrivals]
+        self.assertGreaterEqual(min(delays), 2)
+        self.assertGreater(delays.count(2), 100)
+        self.assertRaises(ValueError, Workload, ['A'])
+        self.assertRaises(ValueError, Workload, self.STATIONS, prio_ratio=2)
+        self.assertRaises(ValueError, Workload, self.STATIONS, od={('A', 'B'): 0})
+
+    def test_feed(self) -> None:
+        """ Arrivals are planned one by one, at the generated times. """
+        env = JarvisEnv()
+        workload = Workload(self.STATIONS, seed=3)
+        arrived = []
+        workload.feed(env, lambda r: arrived.append((env.time(), r.content)), count=50)
+        self.assertEqual(1, len(env.kernel.buckets))
+        env.run()
+        times = list(itertools.accumulate(delay for delay, *_ in self.take(workload, 50)))
+        self.assertEqual(list(zip(times, ['cargo%d' % k for k in range(50)])), arrived)
+
+
+if __name__ == '__main__':
+    unittest.main()